@@ -0,0 +1,159 @@
+"""
+intent_parser.py
+Local, rule-based query parsing for the dashboard demo: dashboard type, time
+period and entity filters, with a confidence score so callers can skip the
+model round-trip for queries it fully understands.
+
+Entity filters are matched against the values actually present in the data
+("Herndon" -> Work_Location "Herndon, VA"), compiled once per data frame.
+"""
+import re
+
+# (dashboard_type, focus, keywords) — on a tie the earlier type wins
+DASHBOARD_TYPES = [
+    ("attrition", "employee attrition analysis",
+     {"attrition", "turnover", "retention", "tenure", "churn", "leavers", "terminations"}),
+    ("hours", "time tracking analysis",
+     {"hours", "hour", "time", "tracking", "worked", "timesheet", "timesheets", "overtime", "utilization"}),
+    ("band_analysis", "band distribution", {"band", "bands", "level", "levels", "grade", "grades"}),
+    ("demographics", "employee demographics", {"demographic", "demographics", "age", "ages", "generation"}),
+    ("location_compare", "location comparison", {"compare", "comparison", "vs", "versus"}),
+    ("project", "project allocation", {"project", "projects", "allocation", "allocations"}),
+]
+GENERAL_FOCUS = "general overview"
+
+# Phrases that set the time period, longest first
+TIME_PERIODS = [
+    (("last", "90", "days"), "last 90 days"),
+    (("past", "90", "days"), "last 90 days"),
+    (("this", "quarter"), "this quarter"),
+    (("current", "quarter"), "this quarter"),
+    (("quarter",), "this quarter"),
+    (("quarterly",), "this quarter"),
+    (("this", "month"), "this month"),
+    (("current", "month"), "this month"),
+    (("month",), "this month"),
+    (("monthly",), "this month"),
+]
+# "last quarter" is not "this quarter" — leave such phrases unexplained
+TIME_MODIFIERS = {"last", "previous", "prior", "past", "next"}
+
+# Words that carry no intent of their own
+STOPWORDS = {
+    "a", "an", "the", "me", "my", "our", "show", "give", "get", "see", "view", "display", "please",
+    "what", "whats", "is", "are", "how", "many", "much", "for", "by", "of", "in", "at", "on", "to",
+    "with", "across", "per", "between", "and", "or", "all", "this", "dashboard", "dashboards",
+    "overview", "breakdown", "summary", "report", "analysis", "distribution", "trend", "trends",
+}
+# Dimensions the dashboards already break down by — understood, but not filters
+DIMENSIONS = {
+    "department", "departments", "location", "locations", "office", "offices", "site", "sites",
+    "org", "orgs", "organization", "organizations", "siglum", "sigla", "team", "teams",
+    "employee", "employees", "staff", "people", "workforce", "headcount",
+}
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+
+
+def _words(text):
+    return [w.lower() for w in _WORD.findall(text) if w.lower() != "and"]
+
+
+class IntentParser:
+    """
+    Parses a query into {"dashboard_type", "filters", "focus", "time_period",
+    "confidence"}. Confidence is the share of the query's words the parser
+    accounted for (keywords, entities, time phrases, dimension and filler
+    words), halved when the words point at more than one dashboard type.
+    """
+
+    def __init__(self, df, entity_columns):
+        self.max_alias = 1
+        self._aliases = {}   # word tuple -> (column, value), matched case-insensitively
+        self._codes = {}     # exact token -> (column, value), e.g. bands "BII", sigla "AAB"
+        ambiguous = set()
+        for column in entity_columns:
+            if column not in df.columns:
+                continue
+            for value in df[column].dropna().astype(str).unique():
+                if re.fullmatch(r"[A-Z0-9]{2,4}", value):
+                    self._codes[value] = (column, value)
+                    continue
+                names = {tuple(_words(value)), tuple(_words(re.split(r",| - ", value)[0]))}
+                for alias in names:
+                    if not alias:
+                        continue
+                    if self._aliases.get(alias, (column, value)) != (column, value):
+                        ambiguous.add(alias)
+                    self._aliases[alias] = (column, value)
+                    self.max_alias = max(self.max_alias, len(alias))
+        for alias in ambiguous:
+            del self._aliases[alias]
+
+    def parse(self, query):
+        raw = [w for w in _WORD.findall(query) if w.lower() != "and"]
+        words = [w.lower() for w in raw]
+        explained = [w in STOPWORDS or w in DIMENSIONS for w in words]
+        filters = {}
+
+        def take(start, length):
+            for k in range(start, start + length):
+                explained[k] = True
+
+        time_period = None
+        i = 0
+        while i < len(words):
+            for phrase, period in TIME_PERIODS:
+                if tuple(words[i:i + len(phrase)]) == phrase:
+                    if i == 0 or words[i - 1] not in TIME_MODIFIERS or phrase[0] in TIME_MODIFIERS:
+                        time_period = time_period or period
+                        take(i, len(phrase))
+                    i += len(phrase) - 1
+                    break
+            i += 1
+
+        i = 0
+        while i < len(words):
+            match = None
+            if raw[i] in self._codes:
+                match, length = self._codes[raw[i]], 1
+            else:
+                for length in range(min(self.max_alias, len(words) - i), 0, -1):
+                    match = self._aliases.get(tuple(words[i:i + length]))
+                    if match:
+                        break
+            if match:
+                column, value = match
+                values = filters.setdefault(column, [])
+                if value not in values:
+                    values.append(value)
+                take(i, length)
+                i += length
+            else:
+                i += 1
+
+        scores = []
+        for dashboard_type, focus, keywords in DASHBOARD_TYPES:
+            hits = [k for k, w in enumerate(words) if w in keywords]
+            for k in hits:
+                explained[k] = True
+            scores.append((len(hits), dashboard_type, focus))
+        best = max(scores, key=lambda s: s[0])
+        dashboard_type, focus = (best[1], best[2]) if best[0] else ("general", GENERAL_FOCUS)
+
+        content = [e for w, e in zip(words, explained) if w not in STOPWORDS]
+        confidence = sum(content) / len(content) if content else 0.0
+        if sum(1 for s in scores if s[0]) > 1:
+            confidence /= 2
+
+        filters = {c: v[0] if len(v) == 1 else v for c, v in filters.items()}
+        if filters:
+            focus = f"{focus}: " + "; ".join(
+                v if isinstance(v, str) else " vs ".join(v) for v in filters.values())
+        return {
+            "dashboard_type": dashboard_type,
+            "filters": filters,
+            "focus": focus,
+            "time_period": time_period,
+            "confidence": round(confidence, 2),
+        }
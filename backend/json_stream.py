@@ -0,0 +1,152 @@
+"""
+json_stream.py
+Incremental, tolerant parsing of JSON that a model streams out in chunks:
+the elements of one array are handed out as soon as each closes, and a
+reply cut off mid-document (token limit, dropped stream) is repaired into
+the longest valid prefix instead of being thrown away.
+"""
+import json
+
+
+class JSONStream:
+    """
+    Feed it the model's chunks; feed() returns the elements of the first
+    array under `array_key` (if given) that each chunk completed. Text before the
+    first bracket (a ```json fence, a preamble) and after the document
+    closes is ignored. value() returns the whole document, repaired if the
+    text stops short of its end.
+
+    Each character is scanned once, however the text is split into chunks.
+    """
+
+    def __init__(self, array_key=None):
+        self.array_key = array_key
+        self.text = ""
+        self.items = []
+        self._pos = 0
+        self._start = None
+        self._end = None
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self._end is not None:
+                break
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                continue
+            if self._start is None:
+                if ch in "{[":
+                    self._start = i
+                else:
+                    continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":":
+                self._key = self._last_string
+            elif ch in "{[":
+                self._stack.append(ch)
+                depth = len(self._stack)
+                if (ch == "[" and self._array_depth is None and depth > 1
+                        and self._stack[-2] == "{" and self._key == self.array_key):
+                    self._array_depth = depth
+                elif depth - 1 == self._array_depth:
+                    self._item_start = i
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if depth == self._array_depth and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:i + 1])
+                    except ValueError:
+                        item = {}
+                    self._item_start = None
+                    self.items.append(item)
+                    completed.append(item)
+                elif depth + 1 == self._array_depth:
+                    self._array_depth = -1
+                if not self._stack:
+                    self._end = i + 1
+        self._pos = len(text)
+        return completed
+
+    @property
+    def complete(self):
+        return self._end is not None
+
+    def value(self):
+        """The parsed document, repaired if truncated; None if there is nothing usable."""
+        if self._start is None:
+            return None
+        if self._end is not None:
+            try:
+                return json.loads(self.text[self._start:self._end])
+            except ValueError:
+                pass
+        return repair_json(self.text[self._start:self._end])
+
+
+def _scan(text):
+    """Open brackets at the end of text, whether it stops inside a string, and the structural , { [ positions."""
+    stack, cuts, in_string, escaped = [], [], False, False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+            cuts.append(i)
+        elif ch in "}]" and stack:
+            stack.pop()
+        elif ch == ",":
+            cuts.append(i)
+    return stack, in_string, cuts
+
+
+def repair_json(text):
+    """
+    Parse the longest prefix of a truncated JSON document that closes into
+    valid JSON, backing up one member or element at a time. A string cut
+    off part-way is dropped rather than closed, so no half-written value
+    (a number missing its last digits) survives. Returns None if not even
+    the opening bracket does.
+    """
+    _, _, cuts = _scan(text)
+    candidates = [text[:i] if text[i] == "," else text[:i + 1] for i in reversed(cuts)]
+    # A number at the very end may be missing digits; the cuts end before a comma or at a bracket
+    if not text.rstrip()[-1:].isdigit():
+        candidates.insert(0, text)
+    for candidate in candidates:
+        stack, in_string, _ = _scan(candidate)
+        if in_string:
+            continue
+        try:
+            return json.loads(candidate + "".join("}" if c == "{" else "]" for c in reversed(stack)))
+        except ValueError:
+            continue
+    return None
@@ -1,13 +1,31 @@
-from flask import Flask, request, jsonify, send_file
-from flask_cors import CORS
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel
+from startup_report import StartupReport
+
+# vertexai, google.cloud.storage and pyarrow are imported on first use (or by
+# the warm-up thread) — on a cold start they would otherwise add seconds
+# before the first request can be served.
+_startup = StartupReport("flask backend")
+with _startup.step("import flask"):
+    from flask import Flask, Response, request, jsonify, send_file, stream_with_context
+    from flask_cors import CORS
 import os
 import json
-import pandas as pd
+import hashlib
+with _startup.step("import pandas/numpy"):
+    import pandas as pd
+    import numpy as np
+import importlib.util
 import io
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from google.cloud import storage
+from singleflight import SingleFlight, LoadTimeout
+from session_store import create_session_store, new_session_id
+from json_stream import JSONStream
+from query_cache import QueryCache, normalize_query
 
 app = Flask(__name__)
 CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "OPTIONS"])
@@ -18,40 +36,690 @@ LOCATION = os.environ.get("GCP_LOCATION", "us-central1")
 BUCKET_NAME = os.environ.get("GCS_BUCKET", "dashboard-generator-data")
 DATA_FILE_GCS = os.environ.get("GCS_FILE", "nominative_list.csv")
 
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-model = GenerativeModel("gemini-2.0-flash-001")
+# Local columnar copy of the CSV, keyed by GCS object generation.
+# Survives within a container's lifetime (and across restarts if the
+# directory is on a mounted volume), so only the first start pays for CSV parsing.
+DATA_CACHE_DIR = os.environ.get("DATA_CACHE_DIR", "/tmp/dataset-cache")
+
+# Background refresh: check the source generation every DATA_POLL_SECONDS
+# (0 = only on /api/reload). LOCAL_DATA_FILE replaces GCS with a local CSV,
+# tracked by mtime — for development, never set in production.
+DATA_POLL_SECONDS = float(os.environ.get("DATA_POLL_SECONDS", "0"))
+LOCAL_DATA_FILE = os.environ.get("LOCAL_DATA_FILE", "")
+# How often each worker process checks DATA_CACHE_DIR for a generation that
+# another worker has already loaded (e.g. after /api/reload hit that worker).
+DATA_SYNC_SECONDS = float(os.environ.get("DATA_SYNC_SECONDS", "5"))
+# How long a request waits for a cold dataset load before getting a 503;
+# the load itself keeps running and serves the retry.
+DATASET_LOAD_TIMEOUT = float(os.environ.get("DATASET_LOAD_TIMEOUT", "30"))
+
+# Text columns with at most this many distinct values are held as pandas
+# categoricals (integer codes + one copy of each label) instead of one
+# Python string object per row.
+CATEGORICAL_MAX_UNIQUE = int(os.environ.get("CATEGORICAL_MAX_UNIQUE", "1000"))
+
+ARROW_CACHE_ENABLED = importlib.util.find_spec("pyarrow") is not None
+if not ARROW_CACHE_ENABLED:
+    print("pyarrow not available - columnar dataset cache disabled")
+
+try:
+    import fcntl
+except ImportError:  # Windows: each worker process loads on its own
+    fcntl = None
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """The Gemini model. The Vertex AI SDK is imported and initialised on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                vertexai = _startup.import_module("vertexai")
+                generative_models = _startup.import_module("vertexai.preview.generative_models")
+                with _startup.step("vertexai.init"):
+                    vertexai.init(project=PROJECT_ID, location=LOCATION)
+                _model = generative_models.GenerativeModel("gemini-2.0-flash-001")
+    return _model
 
 _df_cache = None
+_dataset_version = 0   # bumped on every successful load; keys all derived indexes
+_bitmap_index = None
+_snapshot_index = None
+_summary_cache = None  # {version, text, system_prompt, approx_tokens}
+_binary_columns = None  # {version, "full"/"latest": columns}
+_loaded_generation = None  # source generation behind _df_cache
+_reload_lock = threading.Lock()  # held for the whole of a dataset build
+_summary_lock = threading.Lock()
+_dataset_flight = SingleFlight("dataset")
+
+# Dashboards and their conversations are kept server-side, keyed by a
+# dashboard_id returned with every response; clients send the id and the
+# new message instead of the whole dashboard. "disk" is shared by all
+# gunicorn workers on the instance, "memory" only by one process.
+SESSION_HISTORY = 12  # messages kept per dashboard; the prompt uses the last 4
+_sessions = create_session_store(
+    os.environ.get("SESSION_STORE", "disk"),
+    ttl=float(os.environ.get("SESSION_TTL_SECONDS", "3600")),
+    directory=os.environ.get("SESSION_DIR", "/tmp/dashboard-sessions"),
+)
+
+
+def _normalise_object_columns(df):
+    """
+    Cast mixed-type object columns (e.g. ints and strings in the same column,
+    which low_memory=False produces) to strings so they can be stored in Arrow.
+    Applied on every load path so CSV and cache loads yield identical frames.
+    Every consumer already compares these columns via astype(str).
+    """
+    for col in df.columns:
+        if df[col].dtype == object:
+            kind = pd.api.types.infer_dtype(df[col], skipna=True)
+            if kind in ("mixed", "mixed-integer"):
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _encode_categoricals(df):
+    """
+    Dictionary-encode low-cardinality text columns in place.
+    Done once at load (and stored that way in the columnar cache), so the
+    filter and aggregation paths work on integer codes instead of building
+    a fresh string column on every request.
+    """
+    n_rows = len(df)
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        n_unique = df[col].nunique()
+        if n_unique <= CATEGORICAL_MAX_UNIQUE and n_unique <= n_rows * 0.5:
+            df[col] = df[col].astype("category")
+    return df
+
+
+# astype(str) renders a missing value as "nan" or "None" depending on how it
+# was read; both select the missing rows of a categorical.
+_MISSING_LABELS = ("nan", "None")
+
+
+def _is_categorical(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def _filter_mask(series, values):
+    """
+    Boolean array equivalent to series.astype(str).isin(values).
+    For categoricals the values are matched against the labels once and the
+    row test is done on the integer codes.
+    """
+    wanted = [str(v) for v in values]
+    if _is_categorical(series):
+        codes = np.flatnonzero(series.cat.categories.astype(str).isin(wanted)).tolist()
+        if any(label in wanted for label in _MISSING_LABELS):
+            codes.append(-1)
+        return np.isin(series.cat.codes.to_numpy(), codes)
+    return series.astype(str).isin(wanted).to_numpy()
+
+
+class BitmapIndex:
+    """
+    Inverted index over one version of the loaded dataset: a packed bitmap
+    (1 bit per row) for every (categorical column, value) pair.
+
+    Column bitmaps are built lazily the first time a filter touches the
+    column. A filter dict resolves to a single packed selection by OR-ing
+    bitmaps within a field and AND-ing across fields, so its cost scales
+    with rows/8 bytes per value instead of a full string comparison per
+    row per filter.
+    """
+
+    def __init__(self, df, version):
+        self.df = df
+        self.version = version
+        self.n_rows = len(df)
+        self._columns = {}  # col -> (labels Index, uint8 array [n_labels + 1, n_bytes]; last row = missing)
+        self._subsets = weakref.WeakValueDictionary()  # id(frame) -> frame, see adopt()
+        self._lock = threading.Lock()
+
+    def covers(self, df):
+        """
+        True if df is the indexed frame or a row subset of it passed to
+        adopt(). A frame's labels and attrs alone cannot tell: reset_index()
+        renumbers the rows and keeps dataset_version.
+        """
+        return df is self.df or self._subsets.get(id(df)) is df
+
+    def adopt(self, subset):
+        """
+        Record a row subset of the indexed frame that still carries its
+        labels, which are row positions here — df[mask] or df.loc[labels]
+        on the frame or on another adopted subset. Held weakly.
+        """
+        if (isinstance(self.df.index, pd.RangeIndex) and self.df.index.start == 0
+                and self.df.index.step == 1 and subset.columns.equals(self.df.columns)):
+            with self._lock:
+                self._subsets[id(subset)] = subset
+        return subset
+
+    def indexes(self, col):
+        return col in self.df.columns and _is_categorical(self.df[col])
+
+    def warm(self, cols):
+        """Build the bitmaps of cols ahead of the first filter on them."""
+        for col in cols:
+            if self.indexes(col):
+                self._bitmaps(col)
+
+    def _bitmaps(self, col):
+        entry = self._columns.get(col)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._columns.get(col)
+            if entry is None:
+                series = self.df[col]
+                labels = series.cat.categories.astype(str)
+
+                def build():
+                    codes = series.cat.codes.to_numpy()
+                    codes = np.where(codes < 0, len(labels), codes)
+                    bitmaps = np.empty((len(labels) + 1, (self.n_rows + 7) // 8), dtype=np.uint8)
+                    for code in range(len(labels) + 1):
+                        bitmaps[code] = np.packbits(codes == code)
+                    return bitmaps
+
+                bitmaps = _shared_array(self.df.attrs.get("source_generation"), f"bitmaps:{col}", build)
+                entry = (labels, bitmaps)
+                self._columns[col] = entry
+        return entry
+
+    def select(self, active_filters):
+        """Packed row selection for {field: [values]} over indexed fields only."""
+        selection = None
+        for field, values in active_filters.items():
+            labels, bitmaps = self._bitmaps(field)
+            wanted = [str(v) for v in values]
+            codes = np.flatnonzero(labels.isin(wanted)).tolist()
+            if any(label in wanted for label in _MISSING_LABELS):
+                codes.append(len(labels))
+            if codes:
+                field_bits = np.bitwise_or.reduce(bitmaps[codes], axis=0)
+            else:
+                field_bits = np.zeros(bitmaps.shape[1], dtype=np.uint8)
+            selection = field_bits if selection is None else selection & field_bits
+        return selection
+
+    def mask_for(self, df, active_filters):
+        """Boolean mask aligned to df's rows for filters on indexed fields."""
+        selection = self.select(active_filters)
+        rows = np.unpackbits(selection, count=self.n_rows).view(bool)
+        return rows if df is self.df else rows[df.index.to_numpy()]
+
+
+def get_bitmap_index():
+    """Bitmap index for the currently loaded dataset version (None if nothing is loaded)."""
+    global _bitmap_index
+    if _df_cache is None:
+        return None
+    if _bitmap_index is None or _bitmap_index.df is not _df_cache:
+        _bitmap_index = BitmapIndex(_df_cache, _df_cache.attrs.get("dataset_version", _dataset_version))
+        if _snapshot_index is not None and _snapshot_index["df"] is _df_cache:
+            _bitmap_index.adopt(_snapshot_index["latest"])
+    return _bitmap_index
+
+
+def apply_filters(df, active_filters):
+    """
+    Apply {field: [values]} filters — OR within a field, AND across fields.
+    Fields missing from df or with an empty value list are ignored.
+    When df is (a subset of) the loaded dataset, categorical fields are
+    resolved through the bitmap index; anything else falls back to masks.
+    """
+    active = {f: v for f, v in (active_filters or {}).items() if f in df.columns and v}
+    if not active:
+        return df
+
+    mask = None
+    index = get_bitmap_index()
+    covered = index is not None and index.covers(df)
+    if covered:
+        indexed = {f: v for f, v in active.items() if index.indexes(f)}
+        if indexed:
+            mask = index.mask_for(df, indexed)
+            active = {f: v for f, v in active.items() if f not in indexed}
+
+    for field, values in active.items():
+        field_mask = _filter_mask(df[field], values)
+        mask = field_mask if mask is None else mask & field_mask
+    # Filtering the result again can use the index too
+    return index.adopt(df[mask]) if covered else df[mask]
+
+
+def _value_counts(series):
+    """
+    Equivalent of series.astype(str).value_counts() (missing values count as "nan").
+    Categoricals are counted with np.bincount over their codes; other columns
+    are counted first and only the distinct values are converted to strings.
+    """
+    if not _is_categorical(series):
+        counts = series.value_counts(dropna=False)
+        counts.index = counts.index.astype(str)
+        if not counts.index.is_unique:
+            counts = counts.groupby(level=0).sum()
+        return counts.sort_values(ascending=False, kind="stable")
+    labels = series.cat.categories.astype(str).tolist() + ["nan"]
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes < 0, len(labels) - 1, codes)
+    counts = pd.Series(np.bincount(codes, minlength=len(labels)), index=labels)
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
+
+
+def _to_numeric(series):
+    """pd.to_numeric(errors="coerce") that parses each categorical label only once."""
+    if not _is_categorical(series):
+        return pd.to_numeric(series, errors="coerce")
+    parsed = pd.to_numeric(pd.Series(series.cat.categories), errors="coerce").to_numpy(dtype=float)
+    return pd.Series(_take_by_code(series, parsed, np.nan), index=series.index)
+
+
+def _take_by_code(series, per_label, missing):
+    """Expand one value per category label to one value per row (missing rows get `missing`)."""
+    per_label = np.append(per_label, np.array([missing], dtype=per_label.dtype))
+    codes = series.cat.codes.to_numpy()
+    return per_label[np.where(codes < 0, len(per_label) - 1, codes)]
+
+
+def _to_datetime(series):
+    """pd.to_datetime(errors="coerce") that parses each categorical label only once."""
+    if not _is_categorical(series):
+        return pd.to_datetime(series, errors="coerce")
+    parsed = pd.to_datetime(pd.Series(series.cat.categories), errors="coerce").to_numpy(dtype="datetime64[ns]")
+    return pd.Series(_take_by_code(series, parsed, np.datetime64("NaT", "ns")), index=series.index)
+
+
+def _month_ordinals(series):
+    """Integer month key (year * 12 + month - 1) per row; -1 where the value is not a date."""
+    if _is_categorical(series):
+        per_label = _month_ordinals(pd.Series(series.cat.categories))
+        return _take_by_code(series, per_label, -1)
+    ts = _to_datetime(series)
+    keys = (ts.dt.year * 12 + ts.dt.month - 1).to_numpy(dtype=float)
+    return np.where(np.isnan(keys), -1, keys).astype(np.int64)
+
+
+def _month_label(key):
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def _source_stem():
+    return os.path.splitext(os.path.basename(LOCAL_DATA_FILE or DATA_FILE_GCS))[0]
+
+
+def _columnar_cache_path(generation):
+    """Path of the Arrow IPC file holding one generation of the source file."""
+    return os.path.join(DATA_CACHE_DIR, f"{_source_stem()}.{generation}.arrow")
+
+
+def _read_columnar_cache(path):
+    """
+    Memory-map a cached Arrow IPC file as a DataFrame. Numeric columns and
+    the codes of categoricals without missing values stay backed by the
+    mapping (split_blocks skips consolidating them into new 2-D blocks), so
+    all worker processes share the same page-cache pages instead of each
+    holding a private copy. The mapping lives as long as the frame does.
+    """
+    pa = _startup.import_module("pyarrow")
+    pa_ipc = _startup.import_module("pyarrow.ipc")
+    table = pa_ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _write_columnar_cache(df, path):
+    """
+    Write df as an uncompressed Arrow IPC file (uncompressed so it can be
+    memory-mapped). Written to a temp file and renamed, so a concurrent
+    reader never sees a partial file. Older generations are removed.
+    """
+    pa = _startup.import_module("pyarrow")
+    pa_ipc = _startup.import_module("pyarrow.ipc")
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    # Drop every file of older generations: the data, shared indexes and
+    # temp files. Processes that still map one of them keep a valid mapping.
+    stem = _source_stem()
+    keep = os.path.basename(path)[:-len("arrow")]
+    for name in os.listdir(DATA_CACHE_DIR):
+        if (name.startswith(f"{stem}.") and not name.startswith(keep)
+                and name not in (f"{stem}.lock", f"{stem}.current")):
+            try:
+                os.remove(os.path.join(DATA_CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+@contextmanager
+def _loader_lock():
+    """
+    Lock shared by all worker processes on this host, so one of them parses
+    a new generation while the others wait and then map the file it wrote.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(DATA_CACHE_DIR, f"{_source_stem()}.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _shared_array(generation, name, build):
+    """
+    Index array derived from one source generation, shared by all worker
+    processes: memory-mapped read-only from DATA_CACHE_DIR when another
+    process already built it, otherwise built here and written there first.
+    Without the columnar cache (or for frames not loaded from the source)
+    it is just build().
+    """
+    if generation is None or not ARROW_CACHE_ENABLED:
+        return build()
+    key = hashlib.sha1(name.encode()).hexdigest()[:16]
+    path = os.path.join(DATA_CACHE_DIR, f"{_source_stem()}.{generation}.{key}.npy")
+    if not os.path.exists(path):
+        array = build()
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not share index {name}: {e}")
+            return array
+    return np.load(path, mmap_mode="r")
+
+
+def _publish_generation(generation):
+    """Record the generation this process loaded, for the other workers' watchers."""
+    path = os.path.join(DATA_CACHE_DIR, f"{_source_stem()}.current")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w") as f:
+            f.write(str(generation))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not publish dataset generation: {e}")
+
+
+def _published_generation():
+    try:
+        with open(os.path.join(DATA_CACHE_DIR, f"{_source_stem()}.current")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
 
 def load_dataset():
     """
     Load the workforce CSV from GCS.
     Cached in memory after first load — the dataset only changes when
     a new file is uploaded to the bucket, not between requests.
-    To force a reload (e.g. after uploading new data), restart the Cloud Run instance
-    or call the /api/reload endpoint.
-    No local fallback — always use real data from GCS.
+    To pick up new data, call the /api/reload endpoint or set DATA_POLL_SECONDS;
+    both rebuild in the background and swap the new version in atomically.
+    No local fallback — always use real data from GCS (LOCAL_DATA_FILE is an
+    explicit opt-in replacement for development).
+
+    The first load of each object generation also writes a columnar Arrow
+    copy to DATA_CACHE_DIR; later starts memory-map that file instead of
+    downloading and re-parsing the CSV. Only the object metadata is fetched
+    to check the generation.
+
+    Concurrent cold callers share one load. A caller still waiting after
+    DATASET_LOAD_TIMEOUT gets LoadTimeout, which the app answers with a 503.
     """
-    global _df_cache
     if _df_cache is not None:
         return _df_cache
+    return _dataset_flight.run(_load_first_version, timeout=DATASET_LOAD_TIMEOUT)
+
+
+def _load_first_version():
+    with _reload_lock:
+        if _df_cache is None:
+            try:
+                _build_dataset()
+            except Exception as e:
+                print(f"ERROR loading dataset from GCS: {e}")
+    return _df_cache
+
+
+def _source_generation():
+    """
+    (generation, blob) of the data source: the GCS object generation, or the
+    mtime of LOCAL_DATA_FILE when that is set (blob is then None).
+    """
+    if LOCAL_DATA_FILE:
+        return os.stat(LOCAL_DATA_FILE).st_mtime_ns, None
+    storage = _startup.import_module("google.cloud.storage")
+    client = storage.Client(project=PROJECT_ID)
+    blob = client.bucket(BUCKET_NAME).get_blob(DATA_FILE_GCS)
+    if blob is None:
+        raise FileNotFoundError(f"gs://{BUCKET_NAME}/{DATA_FILE_GCS} does not exist")
+    return blob.generation, blob
+
+
+def _read_dataset(generation, blob):
+    """
+    One generation of the source as a new frame. Returns (df, source).
+
+    With the columnar cache the frame is always mapped from the Arrow file,
+    so worker processes share its memory. The first process to need a new
+    generation parses the CSV and writes the file under _loader_lock();
+    the others wait for it instead of downloading the CSV themselves.
+    """
+    cache_path = _columnar_cache_path(generation) if ARROW_CACHE_ENABLED else None
+    if cache_path:
+        if not os.path.exists(cache_path):
+            with _loader_lock():
+                if not os.path.exists(cache_path):
+                    df, source = _parse_source(generation, blob)
+                    try:
+                        _write_columnar_cache(df, cache_path)
+                    except Exception as e:
+                        print(f"Could not write columnar cache {cache_path}: {e}")
+                        return df, source
+        try:
+            return _encode_categoricals(_read_columnar_cache(cache_path)), cache_path
+        except Exception as e:
+            print(f"Columnar cache unreadable ({e}) — falling back to CSV")
+    return _parse_source(generation, blob)
+
+
+def _parse_source(generation, blob):
+    """Download (or read) and parse the CSV. Returns (df, source)."""
+    if blob is None:
+        with open(LOCAL_DATA_FILE, "rb") as f:
+            raw = f.read()
+        source = LOCAL_DATA_FILE
+    else:
+        # Pin the generation so the cache key always matches the bytes parsed
+        raw = blob.download_as_bytes(if_generation_match=generation)
+        source = f"gs://{BUCKET_NAME}/{DATA_FILE_GCS}#{generation}"
+    df = _normalise_object_columns(pd.read_csv(io.BytesIO(raw), low_memory=False))
+    return _encode_categoricals(df), source
+
+
+def _build_dataset(force=True):
+    """
+    Build the next dataset version off to the side and swap it in. Caller
+    holds _reload_lock, so only one build (and one download) runs at a time.
+
+    The frame and its indexes are built while requests keep reading the
+    current globals; the swap is a handful of reference assignments, with
+    the version bumped last. Frames carry their version in df.attrs (kept by
+    every subset), and an index only resolves its own frame and the subsets
+    it adopted, so a request that started on the old frame never resolves
+    its rows through the new indexes. Without force the build is
+    skipped when the source generation has not changed.
+    """
+    global _df_cache, _dataset_version, _snapshot_index, _bitmap_index, _loaded_generation
+    t0 = datetime.now()
+    generation, blob = _source_generation()
+    if not force and _df_cache is not None and generation == _loaded_generation:
+        return _df_cache
+
+    df, source = _read_dataset(generation, blob)
+    version = _dataset_version + 1
+    df.attrs["dataset_version"] = version
+    df.attrs["source_generation"] = generation
+    snapshot_index = build_snapshot_index(df)
+    bitmap_index = BitmapIndex(df, version)
+    bitmap_index.adopt(snapshot_index["latest"])
+
+    _snapshot_index, _bitmap_index = snapshot_index, bitmap_index
+    _df_cache, _loaded_generation = df, generation
+    _dataset_version = version
+    # Every key carries a version; drop the entries of the versions before
+    _classify_cache.clear()
+    _chart_cache.clear()
+    _plan_cache.clear()
+    if ARROW_CACHE_ENABLED:
+        _publish_generation(generation)
+
     try:
-        client = storage.Client(project=PROJECT_ID)
-        bucket = client.bucket(BUCKET_NAME)
-        blob = bucket.blob(DATA_FILE_GCS)
-        raw = blob.download_as_bytes()
-        df = pd.read_csv(io.BytesIO(raw), low_memory=False)
-        _df_cache = df
-        print(f"Loaded {len(df):,} rows, {len(df.columns)} columns from gs://{BUCKET_NAME}/{DATA_FILE_GCS}")
-        return df
+        refresh_data_summary(df)
     except Exception as e:
-        print(f"ERROR loading dataset from GCS: {e}")
+        print(f"Data summary build failed (retried on first use): {e}")
+    elapsed = (datetime.now() - t0).total_seconds()
+    print(f"Loaded {len(df):,} rows, {len(df.columns)} columns from {source} "
+          f"as version {version} in {elapsed:.2f}s")
+    return df
+
+
+def start_background_reload(force=True):
+    """
+    Rebuild the dataset in a background thread. Returns the thread, or None
+    if a build is already running (that build will publish a version too).
+    """
+    if not _reload_lock.acquire(blocking=False):
         return None
 
+    def run():
+        try:
+            _build_dataset(force=force)
+        except Exception as e:
+            print(f"Dataset reload failed — still serving version {_dataset_version}: {e}")
+        finally:
+            _reload_lock.release()
+
+    thread = threading.Thread(target=run, name="dataset-reload", daemon=True)
+    thread.start()
+    return thread
+
+
+def _watch_source():
+    """
+    Background refresh loop. Every DATA_SYNC_SECONDS, follow a generation
+    another worker process has published; every DATA_POLL_SECONDS (if set),
+    ask the source itself. Either way the reload maps the shared Arrow file
+    when it already exists.
+    """
+    last_poll = time.monotonic()
+    interval = min(DATA_SYNC_SECONDS, DATA_POLL_SECONDS) if DATA_POLL_SECONDS > 0 else DATA_SYNC_SECONDS
+    while True:
+        time.sleep(interval)
+        if _df_cache is None:
+            continue
+        published = _published_generation() if ARROW_CACHE_ENABLED else None
+        if published is not None and published != str(_loaded_generation):
+            start_background_reload(force=False)
+            continue
+        if DATA_POLL_SECONDS <= 0 or time.monotonic() - last_poll < DATA_POLL_SECONDS:
+            continue
+        last_poll = time.monotonic()
+        try:
+            generation, _ = _source_generation()
+        except Exception as e:
+            print(f"Dataset poll failed: {e}")
+            continue
+        if generation != _loaded_generation:
+            start_background_reload(force=False)
+
 
 def get_latest_snapshot(df):
     """
     Isolate the most recent point-in-time snapshot from a longitudinal dataset.
+    For the loaded dataset this is the view materialised by build_snapshot_index()
+    at load time; any other frame is scanned with _find_latest_snapshot().
+    """
+    index = _snapshot_index
+    if index is not None and df is index["df"]:
+        return index["latest"], index["label"]
+    return _find_latest_snapshot(df)
+
+
+def build_snapshot_index(df):
+    """
+    Built once per dataset version by load_dataset():
+      latest / label — materialised latest-snapshot view and its description
+      column         — snapshot month column used for the month partition (or None)
+      months         — {"YYYY-MM": row positions}, in month order
+      month_keys     — {col: _month_ordinals() per row} for the text/datetime
+                       columns named like dates or months; other columns are
+                       added by get_month_keys() on first use
+    """
+    latest, label = _find_latest_snapshot(df)
+    index = {"df": df, "latest": latest, "label": label, "column": None, "months": {}, "month_keys": {}}
+    for col in df.columns:
+        if (any(sig in col for sig in ("date", "Date", "month", "Month"))
+                and not pd.api.types.is_numeric_dtype(df[col])):
+            index["month_keys"][col] = _shared_month_keys(df, col)
+    if "Snapshot_Month_Series" in df.columns:
+        keys = index["month_keys"]["Snapshot_Month_Series"]
+        valid = np.flatnonzero(keys >= 0)
+        if len(valid):
+            keys = keys[valid]
+            order = np.argsort(keys, kind="stable")
+            month_keys, starts = np.unique(keys[order], return_index=True)
+            index["column"] = "Snapshot_Month_Series"
+            index["months"] = {
+                _month_label(k): positions
+                for k, positions in zip(month_keys.tolist(), np.split(valid[order], starts[1:]))
+            }
+    return index
+
+
+def _shared_month_keys(df, col):
+    return _shared_array(df.attrs.get("source_generation"), f"month_keys:{col}",
+                         lambda: _month_ordinals(df[col]))
+
+
+def get_month_keys(df, col):
+    """
+    Month key per row of df for col. For the loaded dataset, or a row subset
+    of it, keys are computed once per version and sliced by row position.
+    """
+    index = _snapshot_index
+    bitmap = get_bitmap_index()
+    if index is None or bitmap is None or index["df"] is not bitmap.df or not bitmap.covers(df):
+        return _month_ordinals(df[col])
+    keys = index["month_keys"].get(col)
+    if keys is None:
+        keys = index["month_keys"][col] = _shared_month_keys(index["df"], col)
+    return keys if df is index["df"] else keys[df.index.to_numpy()]
+
+
+def _find_latest_snapshot(df):
+    """
     Tries three strategies in priority order so it works regardless of which
     snapshot column exists.
     """
@@ -63,7 +731,7 @@ def get_latest_snapshot(df):
 
     if "Snapshot_Month_Series" in df.columns:
         try:
-            ts = pd.to_datetime(df["Snapshot_Month_Series"], errors="coerce")
+            ts = _to_datetime(df["Snapshot_Month_Series"])
             max_ts = ts.max()
             latest = df[ts == max_ts]
             if len(latest) > 0:
@@ -86,12 +754,193 @@ def get_latest_snapshot(df):
     return df, "full dataset"
 
 
+class LRUCache:
+    """
+    Thread-safe LRU mapping with hit/miss counters. With max_bytes set, each
+    value is weighed by sizeof(value) and the least recently used entries are
+    evicted until the total fits as well.
+    """
+
+    def __init__(self, max_entries, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self.bytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes):
+                old, _ = self._data.popitem(last=False)
+                self.bytes -= self._sizes.pop(old)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+        if self.max_bytes is not None:
+            stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
+
+
+_classify_cache = LRUCache(int(os.environ.get("CLASSIFY_CACHE_SIZE", "64")))
+# Chart results are bounded by their serialised size rather than entry count
+_chart_cache = LRUCache(
+    100_000,
+    max_bytes=int(float(os.environ.get("CHART_CACHE_MB", "64")) * 1024 * 1024),
+    sizeof=lambda data: len(json.dumps(data, default=str)),
+)
+
+
+def _filter_signature(active_filters):
+    """Canonical, order-independent string for a {field: [values]} dict (empty lists dropped)."""
+    return json.dumps(
+        {f: sorted(str(v) for v in values) for f, values in (active_filters or {}).items() if values},
+        sort_keys=True,
+    )
+
+
+# Column profiling: type inference runs on a bounded random sample of rows;
+# exact cardinalities, counts and numeric stats are computed only for the
+# columns whose sampled profile makes them matter. Frames no larger than the
+# sample are profiled exactly.
+PROFILE_SAMPLE_ROWS = int(os.environ.get("PROFILE_SAMPLE_ROWS", "20000"))
+PROFILE_WORKERS = int(os.environ.get("PROFILE_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+_ID_SIGNALS = ["_id", "_ID", "Email", "email", "Unique", "SAP", "sap",
+               "Corporate_ID", "Employee_ID", "Manager_Corporate",
+               "First_Name", "Last_Name", "Position_Title",  # personal identifiers
+               "Work_Email", "Legacy_SAP", "HRBP_Corporate", "Operational_Manager"]
+_TEMPORAL_SIGNALS = ["date", "Date", "month", "Month", "year", "Year",
+                     "series", "Series", "_Month", "_Year"]
+
+
+def _n_unique(series):
+    """Exact number of distinct non-null values (bincount over codes for categoricals)."""
+    if _is_categorical(series):
+        codes = series.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    return int(series.nunique())
+
+
+def _first_values(series, k):
+    """First k non-null values in row order, without a full-column dropna."""
+    head = series.iloc[:k * 20].dropna()
+    if len(head) < k:
+        head = series.dropna()
+    return head.head(k)
+
+
+def _profile_column(df, col, positions):
+    """
+    Classify one column. Returns (kind, payload) or None for skipped columns,
+    where kind is one of categorical / numeric / temporal / identity / constant.
+    positions — sampled row positions, or None to profile every row.
+    """
+    full = df[col]
+    n_rows = len(df)
+    sample = (full if positions is None else full.iloc[positions]).dropna()
+    if len(sample) == 0:
+        if not full.notna().any():
+            return None
+        sample = full.dropna()  # rare non-null values the sample missed
+    sample_rows = n_rows if positions is None else len(positions)
+    sample_unique = sample.nunique()
+
+    exact_unique = [_n_unique(full) if _is_categorical(full) else None]
+
+    def n_unique():
+        if exact_unique[0] is None:
+            exact_unique[0] = int(sample_unique) if positions is None else _n_unique(full)
+        return exact_unique[0]
+
+    # 1. Constants — single value, useless
+    if sample_unique == 1 and n_unique() == 1:
+        return "constant", str(sample.iloc[0])
+
+    # 2. Identity — high cardinality, known ID patterns, or personal name columns
+    is_name_col = any(sig in col for sig in _ID_SIGNALS)
+    # Also skip if values look like personal names (contain spaces and mixed case)
+    sample_vals = _first_values(full, 5).astype(str).tolist()
+    looks_like_names = sum(1 for v in sample_vals if ' ' in v and not v.isupper()) >= 3
+    if exact_unique[0] is not None or positions is None:
+        high_cardinality = n_unique() > n_rows * 0.5
+    else:
+        high_cardinality = sample_unique > sample_rows * 0.5
+    if is_name_col or looks_like_names or high_cardinality:
+        return "identity", None
+
+    # 3. Numeric — inferred from the sample, stats computed exactly
+    sample_numeric = _to_numeric(sample)
+    if sample_numeric.notna().sum() / len(sample) > 0.8 and (sample_unique > 10 or n_unique() > 10):
+        numeric = _to_numeric(full).dropna()
+        if pd.api.types.is_numeric_dtype(full.dtype) or numeric.size / full.notna().sum() > 0.8:
+            return "numeric", {
+                "mean": round(float(numeric.mean()), 2),
+                "median": round(float(numeric.median()), 2),
+                "min": round(float(numeric.min()), 2),
+                "max": round(float(numeric.max()), 2),
+                "n": int(numeric.size),
+            }
+
+    # 4. Temporal — date-like column names, parseable as dates in the sample
+    if any(sig in col for sig in _TEMPORAL_SIGNALS):
+        try:
+            if _to_datetime(sample).notna().sum() / len(sample) > 0.7:
+                return "temporal", None
+        except Exception:
+            pass
+
+    # 5. Categorical — 2 to 150 unique values = analytically useful
+    if sample_unique <= 150 and 2 <= n_unique() <= 150:
+        counts = _value_counts(full.dropna())
+        return "categorical", {str(k): int(v) for k, v in counts.head(20).items()}
+
+    # else: >150 unique and not numeric/temporal — free text, skip silently
+    return None
+
+
 def classify_columns(df):
     """
     Automatically classify every column into one of four categories.
     This is the core intelligence layer — it decides which fields have
     analytical value without any hardcoded column names.
 
+    Columns are profiled in parallel (see _profile_column); type inference
+    uses at most PROFILE_SAMPLE_ROWS sampled rows.
+
     Returns a dict:
       categorical: {col: {value: count}}  — useful for groupby / charts
       numeric:     {col: {mean, ...}}     — useful for aggregations
@@ -102,61 +951,42 @@ def classify_columns(df):
     result = {"categorical": {}, "numeric": {}, "temporal": [], "identity": [], "constant": {}}
     n_rows = len(df)
 
-    for col in df.columns:
-        series = df[col].dropna()
-        if len(series) == 0:
-            continue
-        n_unique = series.nunique()
+    positions = None
+    if n_rows > PROFILE_SAMPLE_ROWS:
+        rng = np.random.default_rng(0)  # fixed seed: same frame, same classification
+        positions = np.sort(rng.choice(n_rows, size=PROFILE_SAMPLE_ROWS, replace=False))
 
-        # 1. Constants — single value, useless
-        if n_unique == 1:
-            result["constant"][col] = str(series.iloc[0])
-            continue
+    columns = list(df.columns)
+    if PROFILE_WORKERS > 1 and len(columns) > 1:
+        with ThreadPoolExecutor(max_workers=PROFILE_WORKERS) as pool:
+            profiles = list(pool.map(lambda c: _profile_column(df, c, positions), columns))
+    else:
+        profiles = [_profile_column(df, c, positions) for c in columns]
 
-        # 2. Identity — high cardinality, known ID patterns, or personal name columns
-        id_signals = ["_id", "_ID", "Email", "email", "Unique", "SAP", "sap",
-                      "Corporate_ID", "Employee_ID", "Manager_Corporate",
-                      "First_Name", "Last_Name", "Position_Title",  # personal identifiers
-                      "Work_Email", "Legacy_SAP", "HRBP_Corporate", "Operational_Manager"]
-        is_name_col = any(sig in col for sig in id_signals)
-        # Also skip if values look like personal names (contain spaces and mixed case)
-        sample_vals = series.astype(str).head(5).tolist()
-        looks_like_names = sum(1 for v in sample_vals if ' ' in v and not v.isupper()) >= 3
-        if is_name_col or looks_like_names or n_unique > n_rows * 0.5:
-            result["identity"].append(col)
+    for col, profile in zip(columns, profiles):
+        if profile is None:
             continue
+        kind, payload = profile
+        if kind in ("temporal", "identity"):
+            result[kind].append(col)
+        else:
+            result[kind][col] = payload
 
-        # 3. Numeric
-        numeric = pd.to_numeric(series, errors="coerce")
-        if numeric.notna().sum() / len(series) > 0.8 and n_unique > 10:
-            result["numeric"][col] = {
-                "mean": round(float(numeric.mean()), 2),
-                "median": round(float(numeric.median()), 2),
-                "min": round(float(numeric.min()), 2),
-                "max": round(float(numeric.max()), 2),
-                "n": int(numeric.notna().sum()),
-            }
-            continue
-
-        # 4. Temporal — date-like column names or parseable as dates
-        temporal_signals = ["date", "Date", "month", "Month", "year", "Year",
-                            "series", "Series", "_Month", "_Year"]
-        if any(sig in col for sig in temporal_signals):
-            try:
-                parsed = pd.to_datetime(series, errors="coerce")
-                if parsed.notna().sum() / len(series) > 0.7:
-                    result["temporal"].append(col)
-                    continue
-            except Exception:
-                pass
-
-        # 5. Categorical — 2 to 150 unique values = analytically useful
-        if 2 <= n_unique <= 150:
-            counts = series.astype(str).value_counts()
-            result["categorical"][col] = {str(k): int(v) for k, v in counts.head(20).items()}
+    return result
 
-        # else: >150 unique and not numeric/temporal — free text, skip silently
 
+def classify_columns_cached(df, scope, active_filters=None):
+    """
+    classify_columns() memoized by (dataset version, snapshot scope, filters).
+    df must be the frame that scope ("full" or "latest") and active_filters
+    describe for the current dataset version. The result is shared — treat
+    it as read-only.
+    """
+    key = (df.attrs.get("dataset_version", _dataset_version), scope, _filter_signature(active_filters))
+    result = _classify_cache.get(key)
+    if result is None:
+        result = classify_columns(df)
+        _classify_cache.put(key, result)
     return result
 
 
@@ -239,6 +1069,203 @@ def select_chart_type_for_single(n_unique, is_temporal=False, is_numeric=False):
     return "table"
 
 
+def _factorize(series):
+    """
+    Integer code per row (-1 = missing) and the string label of each code,
+    in sorted label order — the order groupby would use.
+    """
+    if _is_categorical(series):
+        return series.cat.codes.to_numpy(), series.cat.categories.astype(str).tolist()
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, pd.Index(uniques).astype(str).tolist()
+
+
+def _top_k(totals, k):
+    """
+    Positions of the k largest non-zero totals, largest first; ties keep
+    label order. np.partition finds the cut-off so only candidates get sorted.
+    """
+    candidates = np.flatnonzero(totals)
+    if len(candidates) > k:
+        cut = len(candidates) - k
+        cutoff = np.partition(totals[candidates], cut)[cut]
+        candidates = candidates[totals[candidates] >= cutoff]
+    order = np.lexsort((candidates, -totals[candidates]))
+    return candidates[order][:k]
+
+
+def _count_records(series, k):
+    """
+    Top-k value counts as [{"name", "value"}] from one np.bincount over codes.
+    Missing values count as "nan", as with astype(str).value_counts().
+    """
+    codes, labels = _factorize(series)
+    labels = labels + ["nan"]
+    counts = np.bincount(np.where(codes < 0, len(labels) - 1, codes), minlength=len(labels))
+    return [{"name": labels[i], "value": int(counts[i])} for i in _top_k(counts, k).tolist()]
+
+
+def _crosstab_records(df, f1, f2, k, name_key="name", total_key=None):
+    """
+    Top-k rows of the f1 × f2 count matrix, ranked by row total. Rows with a
+    missing f1 or f2 are dropped, as groupby does. Each record holds a count
+    for every f2 value present in df, plus the row total under total_key.
+
+    Row totals are one bincount over f1 codes. Only pairs whose f1 value made
+    the top k are then counted, as a second bincount over the flat index
+    rank * n_columns + column.
+    """
+    c1, labels1 = _factorize(df[f1])
+    c2, labels2 = _factorize(df[f2])
+    valid = (c1 >= 0) & (c2 >= 0)
+    c1, c2 = c1[valid], c2[valid]
+
+    row_totals = np.bincount(c1, minlength=len(labels1))
+    top = _top_k(row_totals, k)
+    present = np.flatnonzero(np.bincount(c2, minlength=len(labels2)))
+    column = np.full(len(labels2), -1)
+    column[present] = np.arange(len(present))
+    rank = np.full(len(labels1), -1)
+    rank[top] = np.arange(len(top))
+
+    row = rank[c1]
+    keep = row >= 0
+    flat = row[keep] * len(present) + column[c2[keep]]
+    cells = np.bincount(flat, minlength=len(top) * len(present)).reshape(len(top), len(present))
+
+    column_labels = [labels2[j] for j in present.tolist()]
+    records = []
+    for i, counts, total in zip(top.tolist(), cells.tolist(), row_totals[top].tolist()):
+        entry = {name_key: labels1[i], **dict(zip(column_labels, counts))}
+        if total_key:
+            entry[total_key] = total
+        records.append(entry)
+    return records
+
+
+def _codes_with_missing(series):
+    """_factorize() with missing values given their own trailing "nan" code."""
+    codes, labels = _factorize(series)
+    labels = labels + ["nan"]
+    return np.where(codes < 0, len(labels) - 1, codes), labels
+
+
+def get_binary_columns(df):
+    """
+    Columns with exactly two distinct values (missing counts as a value) —
+    the candidates for a composed chart's rate line. The list is kept per
+    version for the two unfiltered frames, the loaded dataset and its latest
+    snapshot; any other frame (a filtered one, above all) is scanned itself,
+    since filtering can bring a column down to two values.
+    """
+    global _binary_columns
+    def scan(frame):
+        return [c for c in frame.columns if _n_unique(frame[c]) + bool(frame[c].isna().any()) == 2]
+
+    snapshots = _snapshot_index
+    if _df_cache is not None and df is _df_cache:
+        scope = "full"
+    elif snapshots is not None and snapshots["df"] is _df_cache and df is snapshots["latest"]:
+        scope = "latest"
+    else:
+        return scan(df)
+    if _binary_columns is None or _binary_columns["version"] != _dataset_version:
+        _binary_columns = {"version": _dataset_version}
+    if scope not in _binary_columns:
+        _binary_columns[scope] = scan(df)
+    return _binary_columns[scope]
+
+
+def _composed_records(df, f1, f2, k):
+    """
+    Top-k categories of f1 with their count plus either the mean of f2 or,
+    without f2, the minority rate of the first binary column. Everything is
+    a bincount over f1's codes, so all categories come out of one pass.
+    """
+    c1, labels1 = _codes_with_missing(df[f1])
+    counts = np.bincount(c1, minlength=len(labels1))
+    top = _top_k(counts, k).tolist()
+    result = [{"name": labels1[i], "Count": int(counts[i])} for i in top]
+
+    if f2 and f2 in df.columns:
+        values = _to_numeric(df[f2]).to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.bincount(c1[valid], weights=values[valid], minlength=len(labels1))
+        n = np.bincount(c1[valid], minlength=len(labels1))
+        for entry, i in zip(result, top):
+            entry[f"Avg {f2}"] = round(float(sums[i] / n[i]), 2) if n[i] else 0
+        return result
+
+    for col in get_binary_columns(df):
+        if col == f1:
+            continue
+        c2, labels2 = _codes_with_missing(df[col])
+        present = np.bincount(c2, minlength=len(labels2))
+        if np.count_nonzero(present) != 2:
+            continue
+        minority = int(_top_k(present, 2)[-1])
+        hits = np.bincount(c1[c2 == minority], minlength=len(labels1))
+        for entry, i in zip(result, top):
+            entry[f"{labels2[minority]} Rate %"] = round(hits[i] / counts[i] * 100, 1)
+        break
+    return result
+
+
+def _line_records(df, f1, f2, k):
+    """
+    Row counts per month of f1, split into the top-k values of f2 when given.
+    A bincount over month key (× series code), so neither the frame is copied
+    nor a date formatted per row; months without a parsable date are dropped.
+    """
+    keys = get_month_keys(df, f1)
+    valid = keys >= 0
+    if not valid.any():
+        return []
+    first = int(keys[valid].min())
+    n_months = int(keys[valid].max()) - first + 1
+
+    if not f2 or f2 not in df.columns:
+        counts = np.bincount(keys[valid] - first, minlength=n_months)
+        return [{"name": _month_label(first + m), "value": int(counts[m])}
+                for m in np.flatnonzero(counts).tolist()]
+
+    c2, labels2 = _codes_with_missing(df[f2])
+    top = _top_k(np.bincount(c2, minlength=len(labels2)), k)
+    # Missing values can rank in the top k but are not a series of their own
+    top = np.sort(top[top < len(labels2) - 1])
+    series = np.full(len(labels2), -1)
+    series[top] = np.arange(len(top))
+    s = series[c2]
+    keep = valid & (s >= 0)
+    cells = np.bincount((keys[keep] - first) * len(top) + s[keep],
+                        minlength=n_months * len(top)).reshape(n_months, len(top))
+    present = cells.any(axis=0)
+    names = [labels2[i] for i in top[present].tolist()]
+    cells = cells[:, present]
+    return [{"name": _month_label(first + m), **dict(zip(names, cells[m].tolist()))}
+            for m in np.flatnonzero(cells.any(axis=1)).tolist()]
+
+
+def compute_chart_data_cached(scope, chart_type, fields, active_filters, get_frame):
+    """
+    compute_chart_data() memoized by dataset version, snapshot scope ("full"
+    or "latest") and a canonical hash of (chart_type, fields, active_filters).
+    get_frame() must return the frame that scope and active_filters describe,
+    already filtered; it is only called on a miss. The result is shared —
+    treat it as read-only.
+    """
+    spec = json.dumps([chart_type, list(fields or []), _filter_signature(active_filters)])
+    key = (_dataset_version, scope, hashlib.sha1(spec.encode()).hexdigest())
+    result = _chart_cache.get(key)
+    if result is None:
+        df = get_frame()
+        result = compute_chart_data(df, chart_type, fields)
+        # A request that began before a reload may still hold the old frame
+        if df.attrs.get("dataset_version") == key[0]:
+            _chart_cache.put(key, result)
+    return result
+
+
 def compute_chart_data(df, chart_type, fields, active_filters=None):
     """
     Compute real aggregated data for any chart type from a DataFrame.
@@ -251,10 +1278,7 @@ def compute_chart_data(df, chart_type, fields, active_filters=None):
     fields        — list of column names [primary] or [primary, secondary]
     active_filters — {field: [values]} applied before aggregation
     """
-    if active_filters:
-        for field, values in active_filters.items():
-            if field in df.columns and values:
-                df = df[df[field].astype(str).isin([str(v) for v in values])]
+    df = apply_filters(df, active_filters)
 
     if len(df) == 0:
         return []
@@ -268,138 +1292,64 @@ def compute_chart_data(df, chart_type, fields, active_filters=None):
             if not f1 or f1 not in df.columns:
                 return []
             if f2 and f2 in df.columns:
-                pivot = df.groupby([f1, f2]).size().unstack(fill_value=0)
-                pivot["Total"] = pivot.sum(axis=1)
-                pivot = pivot.sort_values("Total", ascending=False).head(12).reset_index()
-                return [{str(k): (int(v) if hasattr(v, "item") else v)
-                         for k, v in row.items()} for _, row in pivot.iterrows()]
-            counts = df[f1].astype(str).value_counts().reset_index()
-            counts.columns = [f1, "Count"]
-            total = counts["Count"].sum()
-            counts["Share %"] = (counts["Count"] / total * 100).round(1).astype(str) + "%"
-            return counts.head(12).to_dict("records")
+                records = _crosstab_records(df, f1, f2, 12, name_key=f1, total_key="Total")
+                # A numeric f1 keeps its values as numbers, as the groupby pivot rows
+                # did — and a float f1 made the whole row (counts too) floats
+                if pd.api.types.is_numeric_dtype(df[f1]) and not pd.api.types.is_bool_dtype(df[f1]):
+                    cast = float if pd.api.types.is_float_dtype(df[f1]) else int
+                    records = [{k: cast(v) for k, v in r.items()} for r in records]
+                return records
+            records = _count_records(df[f1], 12)
+            shares = np.round(np.array([r["value"] for r in records]) / len(df) * 100, 1)
+            return [{f1: r["name"], "Count": r["value"], "Share %": f"{share}%"}
+                    for r, share in zip(records, shares.tolist())]
 
         # ── DONUT / PIE ───────────────────────────────────────────────────────
         elif chart_type in ("donut", "pie"):
             if not f1 or f1 not in df.columns:
                 return []
-            counts = df[f1].astype(str).value_counts().head(8)
-            return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
+            return _count_records(df[f1], 8)
 
         # ── BAR (single field, optionally binned if numeric) ──────────────────
         elif chart_type == "bar":
             if not f1 or f1 not in df.columns:
                 return []
-            numeric = pd.to_numeric(df[f1], errors="coerce")
+            numeric = _to_numeric(df[f1])
             if numeric.notna().sum() / len(df) > 0.8:
                 bins = pd.cut(numeric.dropna(), bins=8)
                 counts = bins.value_counts().sort_index()
                 return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
-            counts = df[f1].astype(str).value_counts().head(12)
-            return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
+            return _count_records(df[f1], 12)
 
         # ── HORIZONTAL BAR ────────────────────────────────────────────────────
         elif chart_type == "horizontal_bar":
             if not f1 or f1 not in df.columns:
                 return []
             if f2 and f2 in df.columns:
-                pivot = df.groupby([f1, f2]).size().unstack(fill_value=0)
-                pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index[:10]]
-                result = []
-                for idx, row in pivot.iterrows():
-                    entry = {"name": str(idx)}
-                    for col in pivot.columns:
-                        entry[str(col)] = int(row[col])
-                    result.append(entry)
-                return result
-            counts = df[f1].astype(str).value_counts().head(12)
-            return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
-
-        # ── GROUPED BAR ───────────────────────────────────────────────────────
-        elif chart_type == "grouped_bar":
+                return _crosstab_records(df, f1, f2, 10)
+            return _count_records(df[f1], 12)
+
+        # ── GROUPED BAR / STACKED BAR ─────────────────────────────────────────
+        elif chart_type in ("grouped_bar", "stacked_bar"):
             if not f1 or not f2 or f1 not in df.columns or f2 not in df.columns:
                 # Fall back to single-field bar
                 if f1 and f1 in df.columns:
-                    counts = df[f1].astype(str).value_counts().head(10)
-                    return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
+                    return _count_records(df[f1], 10)
                 return []
-            pivot = df.groupby([f1, f2]).size().unstack(fill_value=0)
-            pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index[:8]]
-            result = []
-            for idx, row in pivot.iterrows():
-                entry = {"name": str(idx)}
-                for col in pivot.columns:
-                    entry[str(col)] = int(row[col])
-                result.append(entry)
-            return result
-
-        # ── STACKED BAR ───────────────────────────────────────────────────────
-        elif chart_type == "stacked_bar":
-            if not f1 or not f2 or f1 not in df.columns or f2 not in df.columns:
-                if f1 and f1 in df.columns:
-                    counts = df[f1].astype(str).value_counts().head(10)
-                    return [{"name": str(k), "value": int(v)} for k, v in counts.items()]
-                return []
-            pivot = df.groupby([f1, f2]).size().unstack(fill_value=0)
-            pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index[:8]]
-            result = []
-            for idx, row in pivot.iterrows():
-                entry = {"name": str(idx)}
-                for col in pivot.columns:
-                    entry[str(col)] = int(row[col])
-                result.append(entry)
-            return result
+            return _crosstab_records(df, f1, f2, 8)
 
         # ── COMPOSED (bar count + line avg metric) ────────────────────────────
         elif chart_type == "composed":
             if not f1 or f1 not in df.columns:
                 return []
-            counts = df[f1].astype(str).value_counts().head(8)
-            result = []
-            for k, v in counts.items():
-                subset = df[df[f1].astype(str) == k]
-                entry = {"name": str(k), "Count": int(v)}
-                if f2 and f2 in df.columns:
-                    numeric = pd.to_numeric(subset[f2], errors="coerce").mean()
-                    entry[f"Avg {f2}"] = round(float(numeric), 2) if not pd.isna(numeric) else 0
-                else:
-                    # Find the best binary field to compute a rate
-                    for col in df.columns:
-                        if col == f1:
-                            continue
-                        vc = df[col].astype(str).value_counts()
-                        if len(vc) == 2:
-                            minority = vc.index[-1]
-                            n_minority = len(subset[subset[col].astype(str) == minority])
-                            entry[f"{minority} Rate %"] = round(n_minority / v * 100, 1) if v > 0 else 0
-                            break
-                result.append(entry)
-            return result
+            return _composed_records(df, f1, f2, 8)
 
         # ── LINE / TIME SERIES ────────────────────────────────────────────────
         elif chart_type == "line":
             if not f1 or f1 not in df.columns:
                 return []
             try:
-                df_copy = df.copy()
-                df_copy["_ts"] = pd.to_datetime(df_copy[f1], errors="coerce")
-                df_copy = df_copy.dropna(subset=["_ts"])
-                df_copy["_ts_str"] = df_copy["_ts"].dt.strftime("%Y-%m")
-                if f2 and f2 in df.columns:
-                    top_vals = df[f2].astype(str).value_counts().head(4).index.tolist()
-                    pivot = (df_copy[df_copy[f2].astype(str).isin(top_vals)]
-                             .groupby(["_ts_str", f2]).size().unstack(fill_value=0).reset_index())
-                    result = []
-                    for _, row in pivot.sort_values("_ts_str").iterrows():
-                        entry = {"name": row["_ts_str"]}
-                        for col in pivot.columns:
-                            if col != "_ts_str":
-                                entry[str(col)] = int(row[col])
-                        result.append(entry)
-                    return result
-                ts = df_copy.groupby("_ts_str").size().reset_index(name="value")
-                return [{"name": r["_ts_str"], "value": int(r["value"])}
-                        for _, r in ts.sort_values("_ts_str").iterrows()]
+                return _line_records(df, f1, f2, 4)
             except Exception as e:
                 print(f"Line chart error: {e}")
                 return []
@@ -412,10 +1362,41 @@ def compute_chart_data(df, chart_type, fields, active_filters=None):
     return []
 
 
-def plan_dashboard_charts(df_raw, classified, user_prompt, n_charts=7):
+# Chart plans of new dashboards by normalised prompt — repeated phrasings skip the planner
+_plan_cache = QueryCache(int(os.environ.get("PLAN_CACHE_SIZE", "256")),
+                         float(os.environ.get("PLAN_CACHE_TTL_SECONDS", "3600")))
+
+
+def plan_dashboard_charts_cached(df, classified, user_prompt, n_charts, get_raw, active_filters):
+    """
+    plan_dashboard_charts() memoized by dataset version, normalised prompt,
+    active filters and n_charts. The planner is given the normalised prompt
+    as well, so a hit returns exactly what a miss would have planned.
+    get_raw() must return df_raw filtered like df; it is only called on a
+    miss. Returns fresh plan dicts; their computed_data is shared — treat it
+    as read-only.
+    """
+    prompt = normalize_query(user_prompt)
+    key = (_dataset_version, prompt, _filter_signature(active_filters), n_charts)
+    plans = _plan_cache.get(key)
+    if plans is None:
+        plans = plan_dashboard_charts(df, classified, prompt, n_charts=n_charts,
+                                      df_raw=get_raw(), active_filters=active_filters)
+        # A request that began before a reload may still hold the old frame
+        if df.attrs.get("dataset_version") == key[0]:
+            _plan_cache.put(key, plans)
+    return [dict(plan) for plan in plans]
+
+
+def plan_dashboard_charts(df, classified, user_prompt, n_charts=7, df_raw=None, active_filters=None):
     """
     Deterministic chart planning engine. Runs entirely in Python on real data.
 
+    df             — point-in-time frame (latest snapshot, with any active filters)
+    df_raw         — longitudinal frame for time-series charts (defaults to df)
+    active_filters — the filters df and df_raw were built with; when given,
+                     chart data goes through the chart result cache
+
     Key design principles:
     1. ALWAYS prefer two-field cross-tabulations over single-field counts
        Single-field bar charts are the last resort, not the default
@@ -426,6 +1407,8 @@ def plan_dashboard_charts(df_raw, classified, user_prompt, n_charts=7):
     4. Score fields by relevance to user prompt, then build combinations
     5. Computed data is attached here — Gemini only writes titles/insights
     """
+    if df_raw is None:
+        df_raw = df
     plans = []
     used_combos = set()
     type_counts = {}  # track how many of each type we've used
@@ -474,12 +1457,12 @@ def plan_dashboard_charts(df_raw, classified, user_prompt, n_charts=7):
             return False
         if not can_add_type(chart_type):
             return False
-        data = compute_chart_data(
-            df_raw if chart_type == "line" else
-            df_raw[df_raw["Is_Latest_Snapshot"].astype(str).str.lower().isin(["true","1","yes"])]
-            if "Is_Latest_Snapshot" in df_raw.columns else df_raw,
-            chart_type, fields
-        )
+        frame = df_raw if chart_type == "line" else df
+        if active_filters is None:
+            data = compute_chart_data(frame, chart_type, fields)
+        else:
+            scope = "full" if chart_type == "line" else "latest"
+            data = compute_chart_data_cached(scope, chart_type, fields, active_filters, lambda: frame)
         if not data and chart_type != "table":
             return False
         used_combos.add(combo)
@@ -562,6 +1545,68 @@ def plan_dashboard_charts(df_raw, classified, user_prompt, n_charts=7):
 
 
 def get_data_summary():
+    """
+    The data summary injected into every AI prompt, built by
+    build_data_summary() once per dataset version (at load/reload) and
+    reused verbatim by every /api/chat and /api/deeper-insights call.
+    """
+    df_raw = load_dataset()
+    if df_raw is None:
+        return "Dataset not available — check GCS bucket and file path."
+    return _get_summary_entry(df_raw)["text"]
+
+
+def get_system_prompt():
+    """SYSTEM_PROMPT with the cached data summary already spliced in."""
+    df_raw = load_dataset()
+    if df_raw is None:
+        return SYSTEM_PROMPT.format(data_summary=get_data_summary())
+    return _get_summary_entry(df_raw)["system_prompt"]
+
+
+def _get_summary_entry(df_raw):
+    """
+    Summary of df_raw's version (or a newer one). While a reload is building
+    the next summary, callers get the previous one instead of waiting for it.
+    """
+    entry = _summary_cache
+    version = df_raw.attrs.get("dataset_version", _dataset_version)
+    if entry is not None and entry["version"] >= version:
+        return entry
+    if entry is not None and not _summary_lock.acquire(blocking=False):
+        return entry
+    if entry is None:
+        _summary_lock.acquire()
+    try:
+        entry = _summary_cache
+        if entry is None or entry["version"] < version:
+            entry = _build_summary_entry(df_raw)
+        return entry
+    finally:
+        _summary_lock.release()
+
+
+def refresh_data_summary(df_raw):
+    """Rebuild the cached summary and system prompt for df_raw's dataset version."""
+    with _summary_lock:
+        return _build_summary_entry(df_raw)
+
+
+def _build_summary_entry(df_raw):
+    global _summary_cache
+    text = build_data_summary(df_raw)
+    system_prompt = SYSTEM_PROMPT.format(data_summary=text)
+    _summary_cache = {
+        "version": df_raw.attrs.get("dataset_version", _dataset_version),
+        "text": text,
+        "system_prompt": system_prompt,
+        # ~4 characters per token — enough to budget prompt size without an API round-trip
+        "approx_tokens": len(system_prompt) // 4,
+    }
+    return _summary_cache
+
+
+def build_data_summary(df_raw):
     """
     Produces a 100% data-driven summary injected into every AI prompt.
 
@@ -573,10 +1618,6 @@ def get_data_summary():
       more/fewer employees) reflects automatically without code changes
     - Loads from GCS only — no local fallback to avoid stale data
     """
-    df_raw = load_dataset()
-    if df_raw is None:
-        return "Dataset not available — check GCS bucket and file path."
-
     df, snapshot_label = get_latest_snapshot(df_raw)
 
     # Distinct employee count using best available ID column
@@ -589,10 +1630,15 @@ def get_data_summary():
     # Time coverage — detect temporal columns dynamically
     date_range = ""
     snapshot_months = []
-    classified_raw = classify_columns(df_raw)
+    classified_raw = classify_columns_cached(df_raw, "full")
+    snapshots = _snapshot_index if _snapshot_index is not None and _snapshot_index["df"] is df_raw else None
     for tcol in classified_raw["temporal"]:
+        if snapshots and tcol == snapshots["column"] and snapshots["months"]:
+            snapshot_months = list(snapshots["months"])
+            date_range = f"{snapshot_months[0]} to {snapshot_months[-1]}"
+            break
         try:
-            ts = pd.to_datetime(df_raw[tcol], errors="coerce").dropna()
+            ts = _to_datetime(df_raw[tcol]).dropna()
             if len(ts) > 0:
                 date_range = f"{ts.min().strftime('%Y-%m')} to {ts.max().strftime('%Y-%m')}"
                 snapshot_months = sorted(ts.dt.strftime("%Y-%m").unique().tolist())
@@ -609,7 +1655,7 @@ def get_data_summary():
                     date_range = f"{snapshot_months[0]} to {snapshot_months[-1]}"
                     break
 
-    classified = classify_columns(df)
+    classified = classify_columns_cached(df, "latest")
 
     lines = [
         "=== WORKFORCE DATASET ===",
@@ -735,119 +1781,279 @@ If modifying an existing dashboard: keep all visualizations, only add/change wha
 
 
 
+@app.errorhandler(LoadTimeout)
+def dataset_still_loading(e):
+    """A cold dataset load outlasted DATASET_LOAD_TIMEOUT — ask the client to retry."""
+    response = jsonify({"error": "Dataset is still loading, retry shortly"})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
+# ── Startup warm-up ──────────────────────────────────────────────────────────
+# Everything the first user request would otherwise pay for: the dataset and
+# its indexes, the data summary, and the chart data of the landing-page
+# dashboards. /ready answers 200 only once this has finished.
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# The landing-page prompts (LANDING_PROMPTS in DashboardAgent.jsx)
+WARMUP_PROMPTS = [
+    "Analyze attrition trends and identify which groups have highest turnover risk",
+    "Create a comprehensive workforce overview showing headcount by function, band, and region",
+    "Show a full demographics dashboard: gender, age group, collar type, and contract type",
+    "Visualize organizational structure breakdown by supervisory levels, job families, and bands",
+]
+
+_warmup = {"ready": False, "stage": "not started", "seconds": None, "error": None}
+
+
+def warm_up():
+    """Run the warm-up steps once; raises if any of them fails."""
+    t0 = datetime.now()
+    _warmup["stage"] = "loading dataset"
+    df_raw = _dataset_flight.run(_load_first_version)
+    if df_raw is None:
+        raise RuntimeError(f"could not load gs://{BUCKET_NAME}/{DATA_FILE_GCS}")
+
+    _warmup["stage"] = "building indexes"
+    df_latest, _ = get_latest_snapshot(df_raw)
+    classified = classify_columns_cached(df_latest, "latest")
+    get_bitmap_index().warm(classified["categorical"])
+
+    _warmup["stage"] = "building data summary"
+    get_system_prompt()
+
+    _warmup["stage"] = "precomputing default dashboards"
+    for prompt in WARMUP_PROMPTS:
+        plan_dashboard_charts_cached(df_latest, classified, prompt, 7, lambda: df_raw, {})
+
+    _warmup.update(ready=True, stage="done", error=None,
+                   seconds=round((datetime.now() - t0).total_seconds(), 2))
+    print(f"Warm-up finished in {_warmup['seconds']}s")
+
+    # After readiness, not part of it: a failure here resurfaces on the first chat
+    try:
+        get_model()
+    except Exception as e:
+        print(f"Vertex AI not initialised during warm-up: {e}")
+
+
+def _warm_up_until_ready():
+    delay = 5
+    while True:
+        try:
+            warm_up()
+            return
+        except Exception as e:
+            _warmup["error"] = f"{_warmup['stage']}: {e}"
+            print(f"Warm-up failed ({_warmup['error']}) — retrying in {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
-    df = load_dataset()
-    distinct = 0
-    snapshot = "unknown"
-    if df is not None:
-        id_col = next((c for c in ["Corporate_ID", "Employee_ID"] if c in df.columns), None)
-        if id_col:
-            df_latest, snapshot = get_latest_snapshot(df)
-            distinct = int(df_latest[id_col].nunique())
+    """Liveness: answers from in-memory state only, never loads data."""
+    df = _df_cache
+    index = _snapshot_index
     return jsonify({
         "status": "healthy",
         "project_id": PROJECT_ID,
         "model": "gemini-2.0-flash-001",
         "dataset_loaded": df is not None,
+        "dataset_version": _dataset_version,
         "total_rows": len(df) if df is not None else 0,
-        "distinct_employees_latest_snapshot": distinct,
-        "snapshot": snapshot,
+        "snapshot": index["label"] if index is not None else "unknown",
+        "ready": _warmup["ready"],
         "gcs": f"gs://{BUCKET_NAME}/{DATA_FILE_GCS}",
     })
 
 
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness: 200 once the startup warm-up has finished, 503 until then."""
+    body = {"ready": _warmup["ready"], "stage": _warmup["stage"], "warmup_seconds": _warmup["seconds"],
+            "startup": _startup.as_dict()}
+    if _warmup["error"] and not _warmup["ready"]:
+        body["last_error"] = _warmup["error"]
+    return jsonify(body), 200 if _warmup["ready"] else 503
+
+
 @app.route("/api/reload", methods=["POST"])
 def reload_data():
-    """Force reload the dataset from GCS — call this after uploading new data."""
-    global _df_cache
-    _df_cache = None
-    df = load_dataset()
-    if df is None:
+    """
+    Reload the dataset from GCS — call this after uploading new data.
+    The new version is built in the background while requests keep being
+    served from the current one. Returns 202 straight away, or with
+    ?wait=true blocks until the new version is live and returns its stats.
+    """
+    previous = _dataset_version
+    thread = start_background_reload()
+    if request.args.get("wait", "").lower() not in ("1", "true", "yes"):
+        return jsonify({
+            "status": "reloading" if thread else "already_reloading",
+            "dataset_version": previous,
+        }), 202
+    if thread:
+        thread.join()
+    else:
+        with _reload_lock:  # wait for the build already running
+            pass
+    df = _df_cache
+    if df is None or (thread and _dataset_version == previous):
         return jsonify({"error": "Failed to load dataset from GCS"}), 500
     df_latest, snapshot = get_latest_snapshot(df)
     id_col = next((c for c in ["Corporate_ID", "Employee_ID"] if c in df_latest.columns), None)
     distinct = int(df_latest[id_col].nunique()) if id_col else len(df_latest)
     return jsonify({
         "status": "reloaded",
+        "dataset_version": _dataset_version,
         "total_rows": len(df),
         "distinct_employees": distinct,
         "snapshot": snapshot,
     })
 
 
-@app.route("/api/chat", methods=["POST"])
-def chat():
-    try:
-        data = request.json
-        user_message = data.get("message", "")
+@app.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the in-process caches, for sizing them per instance."""
+    return jsonify({
+        "dataset_version": _dataset_version,
+        "classify_columns": _classify_cache.stats(),
+        "chart_data": _chart_cache.stats(),
+        "dashboard_plans": _plan_cache.stats(),
+        "dashboard_sessions": _sessions.stats(),
+        "data_summary": {
+            "version": _summary_cache["version"],
+            "chars": len(_summary_cache["text"]),
+            "approx_tokens": _summary_cache["approx_tokens"],
+        } if _summary_cache else None,
+    })
+
+
+def _apply_dashboard_delta(dashboard, delta):
+    """
+    A copy of a stored dashboard with a client's local changes applied.
+    Top-level keys replace the stored ones; "visualizations" is a list of
+    partial visualizations merged by id — unknown ids are appended and
+    {"id": ..., "removed": true} drops one. A missing dashboard counts as empty.
+    """
+    dashboard = dashboard or {}
+    if not delta:
+        return dashboard
+    merged = {**dashboard, **{k: v for k, v in delta.items() if k != "visualizations"}}
+    vizs = [dict(v) for v in dashboard.get("visualizations", [])]
+    for change in delta.get("visualizations", []):
+        match = next((v for v in vizs if v.get("id") == change.get("id")), None)
+        if change.get("removed"):
+            vizs = [v for v in vizs if v is not match]
+        elif match is not None:
+            match.update(change)
+        else:
+            vizs.append(dict(change))
+    merged["visualizations"] = vizs
+    return merged
+
+
+def _unknown_dashboard(dashboard_id):
+    """The id expired or lives on another instance — the client resends the full dashboard."""
+    return jsonify({"error": "unknown_dashboard_id", "dashboard_id": dashboard_id}), 409
+
+
+CHAT_GENERATION_CONFIG = {"max_output_tokens": 6000, "temperature": 0.2, "top_p": 0.9}
+
+
+def _prepare_chat_turn(data):
+    """
+    Everything a chat turn does before the model call: resolve the dashboard
+    (stored under dashboard_id, or sent in full), plan the charts with their
+    real data, and build the prompt. Returns (turn, None), or (None, response)
+    when the request cannot be served.
+    """
+    user_message = data.get("message", "")
+    dashboard_id = data.get("dashboard_id")
+    if dashboard_id:
+        session = _sessions.get(dashboard_id)
+        if session is None:
+            return None, _unknown_dashboard(dashboard_id)
+        conversation_history = session["history"]
+        current_dashboard = _apply_dashboard_delta(session["dashboard"], data.get("dashboard_delta"))
+    else:
+        dashboard_id = new_session_id()
         conversation_history = data.get("history", [])
         current_dashboard = data.get("current_dashboard", None)
 
-        active_filters = data.get("active_filters", {})
+    active_filters = data.get("active_filters", {})
 
-        df_raw = load_dataset()
-        if df_raw is None:
-            return jsonify({"error": "Dataset not available"}), 503
-
-        df_latest, snapshot_label = get_latest_snapshot(df_raw)
-
-        # Apply active filters to the planning dataset
-        df_filtered = df_latest.copy()
-        if active_filters:
-            for field, values in active_filters.items():
-                if field in df_filtered.columns and values:
-                    df_filtered = df_filtered[
-                        df_filtered[field].astype(str).isin([str(v) for v in values])
-                    ]
-
-        classified = classify_columns(df_filtered)
-
-        # ── STEP 1: Python plans the charts deterministically ─────────────────
-        # If new dashboard: plan from scratch using field relevance scoring
-        # If modifying: keep existing plans, just add what was requested
-        if not current_dashboard:
-            chart_plans = plan_dashboard_charts(
-                df_filtered, classified, user_message, n_charts=7, df_raw=df_raw
-            )
-        else:
-            # Modification — re-compute data for existing charts with new filters
-            chart_plans = []
-            for viz in current_dashboard.get("visualizations", []):
-                fields = viz.get("fields", [])
-                chart_type = viz.get("type", "bar")
-                computed = compute_chart_data(df_filtered, chart_type, fields, {})
-                chart_plans.append({
-                    "fields": fields,
-                    "type": chart_type,
-                    "computed_data": computed,
-                    "existing_title": viz.get("title", ""),
-                    "existing_description": viz.get("description", ""),
-                    "existing_insights": viz.get("key_insights", []),
-                })
+    df_raw = load_dataset()
+    if df_raw is None:
+        return None, (jsonify({"error": "Dataset not available"}), 503)
 
-        # ── STEP 2: Build the prompt — Gemini only writes narrative ───────────
-        data_summary = get_data_summary()
+    df_latest, snapshot_label = get_latest_snapshot(df_raw)
 
-        # Serialize chart plans for Gemini (without the bulk computed_data)
-        chart_specs_for_prompt = []
-        for i, plan in enumerate(chart_plans):
-            # Give Gemini a compact data preview — first 8 rows only
-            data_preview = plan.get("computed_data", [])[:8]
-            spec = {
-                "chart_index": i + 1,
-                "chart_type": plan["type"],
-                "fields": plan["fields"],
-                "data_preview": data_preview,
-            }
-            if plan.get("existing_title"):
-                spec["existing_title"] = plan["existing_title"]
-            chart_specs_for_prompt.append(spec)
+    # Apply active filters to the planning dataset
+    df_filtered = apply_filters(df_latest, active_filters)
 
-        id_col = next((c for c in ["Corporate_ID", "Employee_ID"] if c in df_filtered.columns), None)
-        distinct_n = int(df_filtered[id_col].nunique()) if id_col else len(df_filtered)
+    classified = classify_columns_cached(df_filtered, "latest", active_filters)
+
+    # ── STEP 1: Python plans the charts deterministically ─────────────────
+    # If new dashboard: plan from scratch using field relevance scoring
+    # If modifying: keep existing plans, just add what was requested
+    if not current_dashboard:
+        chart_plans = plan_dashboard_charts_cached(
+            df_filtered, classified, user_message, 7,
+            lambda: apply_filters(df_raw, active_filters), active_filters,
+        )
+        for i, plan in enumerate(chart_plans):
+            plan["id"] = f"viz-{i+1}"
+    else:
+        # Modification — re-compute data for existing charts with new filters
+        chart_plans = []
+        for i, viz in enumerate(current_dashboard.get("visualizations", [])):
+            fields = viz.get("fields", [])
+            chart_type = viz.get("type", "bar")
+            computed = compute_chart_data_cached(
+                "latest", chart_type, fields, active_filters, lambda: df_filtered)
+            chart_plans.append({
+                "id": viz.get("id") or f"viz-{i+1}",
+                "fields": fields,
+                "type": chart_type,
+                "computed_data": computed,
+                "existing_title": viz.get("title", ""),
+                "existing_description": viz.get("description", ""),
+                "existing_insights": viz.get("key_insights", []),
+            })
+
+    # ── STEP 2: Build the prompt — Gemini only writes narrative ───────────
+    # Serialize chart plans for Gemini (without the bulk computed_data)
+    chart_specs_for_prompt = []
+    for i, plan in enumerate(chart_plans):
+        # Give Gemini a compact data preview — first 8 rows only
+        data_preview = plan.get("computed_data", [])[:8]
+        spec = {
+            "chart_index": i + 1,
+            "chart_type": plan["type"],
+            "fields": plan["fields"],
+            "data_preview": data_preview,
+        }
+        if plan.get("existing_title"):
+            spec["existing_title"] = plan["existing_title"]
+        chart_specs_for_prompt.append(spec)
+
+    id_col = next((c for c in ["Corporate_ID", "Employee_ID"] if c in df_filtered.columns), None)
+    distinct_n = int(df_filtered[id_col].nunique()) if id_col else len(df_filtered)
+
+    existing_block = ""
+    if current_dashboard:
+        # The charts' data is already in the plans above — only the narrative is needed here
+        narrative = {
+            **current_dashboard,
+            "visualizations": [{k: v for k, v in viz.items() if k != "computed_data"}
+                               for viz in current_dashboard.get("visualizations", [])],
+        }
+        existing_block = ("EXISTING DASHBOARD (modify mode — keep structure, update narrative only):\n"
+                          + json.dumps(narrative, indent=2)[:2000])
 
-        prompt = f"""{SYSTEM_PROMPT.format(data_summary=data_summary)}
+    prompt = f"""{get_system_prompt()}
 
 === PRE-COMPUTED CHART PLANS ===
 The Python backend has already selected the chart types and computed real data.
@@ -861,7 +2067,7 @@ CHART PLANS (use these exact types and fields — do NOT change them):
 
 USER REQUEST: {user_message}
 
-{f'EXISTING DASHBOARD (modify mode — keep structure, update narrative only):\n{json.dumps(current_dashboard, indent=2)[:2000]}' if current_dashboard else ''}
+{existing_block}
 
 CONVERSATION CONTEXT:
 {chr(10).join([f"{'User' if m['role']=='user' else 'AI'}: {m['content']}" for m in conversation_history[-4:]])}
@@ -871,59 +2077,165 @@ one per chart plan above, in the same order.
 Each visualization must include: id, type (MUST match chart_type from plan), fields (MUST match),
 title, description, key_insights (2-3 bullets with real numbers from data_preview).
 """
+    return {
+        "dashboard_id": dashboard_id,
+        "user_message": user_message,
+        "history": conversation_history,
+        "current_dashboard": current_dashboard,
+        "chart_plans": chart_plans,
+        "prompt": prompt,
+    }, None
+
+
+def _chunk_text(chunk):
+    # The last chunk of a stream stopped for length or safety may carry no text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
 
-        response = model.generate_content(
-            prompt,
-            generation_config={"max_output_tokens": 6000, "temperature": 0.2, "top_p": 0.9},
-        )
 
-        raw = response.text.strip()
-        for fence in ["```json", "```"]:
-            if fence in raw:
-                start = raw.find(fence) + len(fence)
-                end = raw.rfind("```")
-                raw = raw[start:end].strip()
-                break
+def _generate_json(prompt, generation_config, array_key=None):
+    """Stream the model's reply into a JSONStream — tolerant of fences and a truncated tail."""
+    stream = JSONStream(array_key)
+    for chunk in get_model().generate_content(prompt, generation_config=generation_config, stream=True):
+        stream.feed(_chunk_text(chunk))
+    return stream
 
-        try:
-            parsed = json.loads(raw)
-        except Exception as e:
-            print(f"JSON parse error: {e}\nRaw: {raw[:400]}")
-            parsed = {
-                "message": "Dashboard generated.",
-                "dashboard": current_dashboard,
-                "suggestions": [],
-            }
 
-        # ── STEP 3: Attach real computed_data to every visualization ─────────
-        # The computed data from chart_plans is the source of truth —
-        # overrides anything Gemini may have invented
-        dashboard = parsed.get("dashboard")
-        if dashboard and "visualizations" in dashboard:
-            vizs = dashboard["visualizations"]
-            for i, plan in enumerate(chart_plans):
-                if i < len(vizs):
-                    # Enforce correct type and fields from the plan
-                    vizs[i]["type"] = plan["type"]
-                    vizs[i]["fields"] = plan["fields"]
-                    vizs[i]["computed_data"] = plan.get("computed_data", [])
-                    if "id" not in vizs[i]:
-                        vizs[i]["id"] = f"viz-{i+1}"
+def _parsed_reply(stream):
+    """The model's JSON reply, repaired if it was cut short; None if nothing usable came back."""
+    parsed = stream.value()
+    if not isinstance(parsed, dict):
+        print(f"JSON parse error: no usable JSON object\nRaw: {stream.text[:400]}")
+        return None
+    if not stream.complete:
+        print(f"Model reply truncated after {len(stream.text):,} chars — kept the complete part")
+    return parsed
+
+
+def _finish_chat_turn(turn, stream):
+    """Parse the model's reply, attach the real chart data, store the dashboard. Returns the response body."""
+    parsed = _parsed_reply(stream) or {}
+
+    # ── STEP 3: Attach real computed_data to every visualization ─────────
+    # The computed data from chart_plans is the source of truth —
+    # overrides anything Gemini may have invented
+    dashboard = parsed.get("dashboard")
+    if not isinstance(dashboard, dict) or not dashboard:
+        # Missing, or the reply was cut off before it — keep the current dashboard
+        dashboard = turn["current_dashboard"]
+    if dashboard and "visualizations" in dashboard:
+        vizs = dashboard["visualizations"]
+        for i, plan in enumerate(turn["chart_plans"]):
+            if i >= len(vizs):
+                # The reply was cut short before this chart — keep the chart anyway
+                vizs.append({})
+            # Enforce correct id, type and fields from the plan
+            vizs[i]["id"] = plan["id"]
+            vizs[i]["type"] = plan["type"]
+            vizs[i]["fields"] = plan["fields"]
+            vizs[i]["computed_data"] = plan.get("computed_data", [])
+            vizs[i].setdefault("title", plan.get("existing_title") or " by ".join(plan["fields"]))
+            vizs[i].setdefault("description", plan.get("existing_description", ""))
+            vizs[i].setdefault("key_insights", plan.get("existing_insights", []))
+
+    reply = parsed.get("message", "Dashboard generated.")
+    history = list(turn["history"]) + [
+        {"role": "user", "content": turn["user_message"]},
+        {"role": "assistant", "content": reply},
+    ]
+    # Never store None: the next turn would lose the dashboard the client still shows
+    _sessions.put(turn["dashboard_id"], {"dashboard": dashboard or {}, "history": history[-SESSION_HISTORY:]})
+
+    return {
+        "response": reply,
+        "dashboard": dashboard or None,
+        "dashboard_id": turn["dashboard_id"],
+        "suggestions": parsed.get("suggestions", []),
+        "analysis_type": parsed.get("analysis_type", "custom"),
+        "timestamp": datetime.now().isoformat(),
+    }
 
-        return jsonify({
-            "response": parsed.get("message", "Dashboard generated."),
-            "dashboard": dashboard,
-            "suggestions": parsed.get("suggestions", []),
-            "analysis_type": parsed.get("analysis_type", "custom"),
-            "timestamp": datetime.now().isoformat(),
-        })
 
+@app.route("/api/chat", methods=["POST"])
+def chat():
+    """
+    Body: {"message", "active_filters", "dashboard_id", "dashboard_delta"} for a
+    stored dashboard, or {"message", "active_filters", "history",
+    "current_dashboard"} for a new one / after a 409 for an unknown id.
+    """
+    try:
+        turn, error = _prepare_chat_turn(request.json)
+        if error:
+            return error
+        stream = _generate_json(turn["prompt"], CHAT_GENERATION_CONFIG)
+        return jsonify(_finish_chat_turn(turn, stream))
+
+    except LoadTimeout:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e), "message": "Error processing request."}), 500
 
 
+def _ndjson(event):
+    return json.dumps(event, default=str) + "\n"
+
+
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    /api/chat as a stream of NDJSON events, one per line:
+      {"event": "plans", "dashboard_id", "visualizations": [{id, type, fields, computed_data}]}
+          — sent as soon as the charts are planned, before the model is called
+      {"event": "visualization", "id", "title", "description", "key_insights"}
+          — one chart's narrative, as soon as the model has written it
+      {"event": "done", ...}  — the same body /api/chat returns
+      {"event": "error", "error"}
+    Failures before the stream starts (409 unknown dashboard_id, 503) are
+    plain JSON responses, as from /api/chat.
+    """
+    try:
+        turn, error = _prepare_chat_turn(request.json)
+        if error:
+            return error
+    except LoadTimeout:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e), "message": "Error processing request."}), 500
+
+    plans = turn["chart_plans"]
+
+    def events():
+        yield _ndjson({
+            "event": "plans",
+            "dashboard_id": turn["dashboard_id"],
+            "visualizations": [{"id": p["id"], "type": p["type"], "fields": p["fields"],
+                                "computed_data": p.get("computed_data", [])} for p in plans],
+        })
+        try:
+            stream = JSONStream("visualizations")
+            chunks = get_model().generate_content(
+                turn["prompt"], generation_config=CHAT_GENERATION_CONFIG, stream=True)
+            for chunk in chunks:
+                first = len(stream.items)
+                for plan, viz in zip(plans[first:], stream.feed(_chunk_text(chunk))):
+                    narrative = {k: viz[k] for k in ("title", "description", "key_insights") if k in viz}
+                    yield _ndjson({"event": "visualization", "id": plan["id"], **narrative})
+            yield _ndjson({"event": "done", **_finish_chat_turn(turn, stream)})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield _ndjson({"event": "error", "error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route("/api/chart-data", methods=["POST"])
 def get_chart_data():
     """
@@ -940,9 +2252,54 @@ def get_chart_data():
         if df_raw is None:
             return jsonify({"data": []})
 
-        df, _ = get_latest_snapshot(df_raw)
-        computed = compute_chart_data(df, viz_type, fields, active_filters)
+        # Line charts span every snapshot (as in the planner); everything else is point-in-time
+        scope = "full" if viz_type == "line" else "latest"
+        df = df_raw if viz_type == "line" else get_latest_snapshot(df_raw)[0]
+        computed = compute_chart_data_cached(
+            scope, viz_type, fields, active_filters, lambda: apply_filters(df, active_filters))
         return jsonify({"data": computed})
+    except LoadTimeout:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/chart-data/batch", methods=["POST"])
+def get_chart_data_batch():
+    """
+    Recompute every visualization of a dashboard in one request — used when filters change.
+    The dataset is loaded once and, for cache misses, filtered once and shared
+    by all charts, instead of once per chart.
+
+    Body:    {"visualizations": [{"id", "type", "fields"}, ...], "active_filters": {field: [values]}}
+    Returns: {"data": {viz_id: computed_data, ...}}
+    """
+    try:
+        req = request.json
+        visualizations = req.get("visualizations", [])
+        active_filters = req.get("active_filters", {})
+
+        df_raw = load_dataset()
+        if df_raw is None:
+            return jsonify({"data": {}})
+
+        frames = {}
+
+        def filtered(scope):
+            if scope not in frames:
+                df = df_raw if scope == "full" else get_latest_snapshot(df_raw)[0]
+                frames[scope] = apply_filters(df, active_filters)
+            return frames[scope]
+
+        results = {}
+        for i, viz in enumerate(visualizations):
+            viz_type = viz.get("type", "bar")
+            scope = "full" if viz_type == "line" else "latest"
+            results[str(viz.get("id", i))] = compute_chart_data_cached(
+                scope, viz_type, viz.get("fields", []), active_filters, lambda: filtered(scope))
+        return jsonify({"data": results})
+    except LoadTimeout:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -953,10 +2310,20 @@ def deeper_insights():
     Generate richer analyst-quality insights for a specific visualization.
     This is called when user clicks "Generate deeper insights" — it returns
     enhanced key_insights for each chart based on the actual computed data.
+    Takes {"dashboard_id"} for a stored dashboard or the full {"dashboard"}.
     """
     try:
         req = request.json
-        dashboard = req.get("dashboard", {})
+        dashboard_id = req.get("dashboard_id")
+        session = None
+        if dashboard_id:
+            session = _sessions.get(dashboard_id)
+            if session is None:
+                return _unknown_dashboard(dashboard_id)
+            dashboard = session["dashboard"] or {}
+        else:
+            dashboard_id = new_session_id()
+            dashboard = req.get("dashboard", {})
         active_filters = req.get("active_filters", {})
 
         if not dashboard:
@@ -964,12 +2331,25 @@ def deeper_insights():
 
         # Build a data-rich context for each visualization
         df_raw2 = load_dataset()
-        df_latest, _ = get_latest_snapshot(df_raw2) if df_raw2 is not None else (None, "")
+        frames = {}
+
+        def filtered(scope):
+            if scope not in frames:
+                df = df_raw2 if scope == "full" else get_latest_snapshot(df_raw2)[0]
+                frames[scope] = apply_filters(df, active_filters)
+            return frames[scope]
+
         viz_data_context = []
+        current_data = {}
         for viz in dashboard.get("visualizations", []):
             fields = viz.get("fields", [])
-            computed = compute_chart_data(df_latest, viz["type"], fields, active_filters) if df_latest is not None else []
+            # Line charts span every snapshot, as in the planner and /api/chart-data
+            scope = "full" if viz["type"] == "line" else "latest"
+            computed = compute_chart_data_cached(
+                scope, viz["type"], fields, active_filters,
+                lambda: filtered(scope)) if df_raw2 is not None else []
             if computed:
+                current_data[viz.get("id", "")] = computed
                 viz_data_context.append({
                     "id": viz.get("id", ""),
                     "title": viz.get("title", ""),
@@ -1009,20 +2389,13 @@ Respond ONLY with valid JSON, no markdown:
   ]
 }}"""
 
-        response = model.generate_content(
+        stream = _generate_json(
             prompt,
-            generation_config={"max_output_tokens": 4096, "temperature": 0.2, "top_p": 0.9},
+            {"max_output_tokens": 4096, "temperature": 0.2, "top_p": 0.9},
         )
-
-        raw = response.text.strip()
-        for fence in ["```json", "```"]:
-            if fence in raw:
-                start = raw.find(fence) + len(fence)
-                end = raw.rfind("```")
-                raw = raw[start:end].strip()
-                break
-
-        parsed = json.loads(raw)
+        parsed = _parsed_reply(stream)
+        if parsed is None:
+            raise ValueError("Model returned no usable JSON")
 
         # Merge enhanced insights back into the dashboard visualizations
         enhanced = parsed.get("enhanced_insights", {})
@@ -1031,6 +2404,9 @@ Respond ONLY with valid JSON, no markdown:
             viz_id = viz.get("id", "")
             if viz_id in enhanced:
                 viz = {**viz, "key_insights": enhanced[viz_id]}
+            # A stored dashboard may hold data for other filters than the current ones
+            if viz_id in current_data:
+                viz = {**viz, "computed_data": current_data[viz_id]}
             updated_vizs.append(viz)
 
         updated_dashboard = {
@@ -1039,11 +2415,21 @@ Respond ONLY with valid JSON, no markdown:
             "overall_insights": parsed.get("overall_insights", dashboard.get("overall_insights", [])),
         }
 
+        message = "Insights refreshed with actual data."
+        history = list(session["history"]) if session else []
+        _sessions.put(dashboard_id, {
+            "dashboard": updated_dashboard,
+            "history": (history + [{"role": "assistant", "content": message}])[-SESSION_HISTORY:],
+        })
+
         return jsonify({
             "dashboard": updated_dashboard,
-            "message": "Insights refreshed with actual data.",
+            "dashboard_id": dashboard_id,
+            "message": message,
         })
 
+    except LoadTimeout:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1065,7 +2451,7 @@ def get_schema():
 
     # Dynamically detect filterable fields using classify_columns
     # Only categorical fields (2-150 unique values) are useful as filters
-    classified = classify_columns(df)
+    classified = classify_columns_cached(df, "latest")
 
     distinct_values = {}
     for col, counts in classified["categorical"].items():
@@ -1090,6 +2476,17 @@ def get_schema():
     })
 
 
+if DATA_POLL_SECONDS > 0 or ARROW_CACHE_ENABLED:
+    threading.Thread(target=_watch_source, name="dataset-watch", daemon=True).start()
+
+if WARMUP_ENABLED:
+    threading.Thread(target=_warm_up_until_ready, name="warm-up", daemon=True).start()
+else:
+    _warmup.update(ready=True, stage="disabled")
+
+_startup.module_loaded()
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     app.run(host="0.0.0.0", port=port, debug=False)
\ No newline at end of file
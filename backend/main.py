@@ -1,12 +1,24 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
+from startup_report import StartupReport
+
+# plotly and the Vertex AI SDK are imported on first use or by the warm-up
+# thread started at the bottom of this module, not at import time.
+_startup = StartupReport("fastapi demo")
+with _startup.step("import fastapi"):
+    from fastapi import FastAPI, Request
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import HTMLResponse, JSONResponse
+with _startup.step("import pandas"):
+    import pandas as pd
+import asyncio
 import json
 import os
 import random
+import threading
+import time
 from datetime import datetime, timedelta
+from singleflight import SingleFlight, LoadTimeout
+from intent_parser import IntentParser
+from query_cache import QueryCache, normalize_query
 
 app = FastAPI(title="Employee Dashboard Agent - Enhanced")
 
@@ -14,29 +26,53 @@ app = FastAPI(title="Employee Dashboard Agent - Enhanced")
 PROJECT_ID = os.getenv("PROJECT_ID", "molten-album-478703-d8")
 LOCATION = "us-central1"
 
-try:
-    from google.cloud import aiplatform
-    import vertexai
-    try:
-        from vertexai.generative_models import GenerativeModel
-        VERTEX_AI_ENABLED = True
-    except ImportError:
-        try:
-            from vertexai.preview.generative_models import GenerativeModel
-            VERTEX_AI_ENABLED = True
-        except ImportError:
-            GenerativeModel = None
-            VERTEX_AI_ENABLED = False
-    
-    if VERTEX_AI_ENABLED:
+VERTEX_AI_ENABLED = None  # unknown until init_vertex_ai() has run
+GenerativeModel = None
+_vertex_lock = threading.Lock()
+
+def init_vertex_ai():
+    """Import and initialise the Vertex AI SDK once; returns VERTEX_AI_ENABLED."""
+    global VERTEX_AI_ENABLED, GenerativeModel
+    if VERTEX_AI_ENABLED is not None:
+        return VERTEX_AI_ENABLED
+    with _vertex_lock:
+        if VERTEX_AI_ENABLED is not None:
+            return VERTEX_AI_ENABLED
         try:
-            vertexai.init(project=PROJECT_ID, location=LOCATION)
-        except Exception as e:
+            _startup.import_module("google.cloud.aiplatform")
+            vertexai = _startup.import_module("vertexai")
+            try:
+                GenerativeModel = _startup.import_module("vertexai.generative_models").GenerativeModel
+            except ImportError:
+                GenerativeModel = _startup.import_module("vertexai.preview.generative_models").GenerativeModel
+            try:
+                with _startup.step("vertexai.init"):
+                    vertexai.init(project=PROJECT_ID, location=LOCATION)
+                VERTEX_AI_ENABLED = True
+            except Exception as e:
+                VERTEX_AI_ENABLED = False
+                print(f"Vertex AI initialization failed: {e}")
+        except Exception:
             VERTEX_AI_ENABLED = False
-            print(f"Vertex AI initialization failed: {e}")
-except:
-    VERTEX_AI_ENABLED = False
-    print("Vertex AI not available - using fallback query parsing")
+            print("Vertex AI not available - using fallback query parsing")
+    return VERTEX_AI_ENABLED
+
+QUERY_MODEL_NAME = "gemini-1.5-pro-001"
+QUERY_PARSE_TIMEOUT = float(os.getenv("QUERY_PARSE_TIMEOUT", "8"))
+_query_model = None
+
+def get_query_model():
+    """The query-parsing model, created once and shared by every request; None without Vertex AI."""
+    global _query_model
+    if _query_model is None and init_vertex_ai():
+        with _vertex_lock:
+            if _query_model is None:
+                _query_model = GenerativeModel(QUERY_MODEL_NAME)
+    return _query_model
+
+def load_plotly():
+    """plotly.graph_objects, imported on first use."""
+    return _startup.import_module("plotly.graph_objects")
 
 # ============================================================================
 # FAKE DATA GENERATION
@@ -196,19 +232,162 @@ def generate_fake_time_tracking(employees_df, days=90):
 
 _cached_employees = None
 _cached_time_tracking = None
+_employees_flight = SingleFlight("sample employees")
+_time_tracking_flight = SingleFlight("sample time tracking")
+SAMPLE_DATA_TIMEOUT = float(os.getenv("SAMPLE_DATA_TIMEOUT", "10"))
+# Bumped whenever either sample frame is (re)generated; part of every rendered-dashboard key
+_sample_data_version = 0
 
-def get_sample_employees():
+def _sample_data_changed():
+    global _sample_data_version
+    _sample_data_version += 1
+    _dashboard_cache.clear()
+
+def _build_sample_employees():
     global _cached_employees
     if _cached_employees is None:
         _cached_employees = generate_fake_employees(count=75)
-    return _cached_employees.copy()
+        _sample_data_changed()
+    return _cached_employees
 
-def get_sample_time_tracking():
+def _build_sample_time_tracking():
     global _cached_time_tracking
     if _cached_time_tracking is None:
-        employees_df = get_sample_employees()
-        _cached_time_tracking = generate_fake_time_tracking(employees_df, days=90)
-    return _cached_time_tracking.copy()
+        _cached_time_tracking = generate_fake_time_tracking(get_sample_employees(), days=90)
+        _sample_data_changed()
+    return _cached_time_tracking
+
+def get_sample_employees():
+    employees = _cached_employees
+    if employees is None:
+        employees = _employees_flight.run(_build_sample_employees, timeout=SAMPLE_DATA_TIMEOUT)
+    return employees.copy()
+
+def get_sample_time_tracking():
+    time_tracking = _cached_time_tracking
+    if time_tracking is None:
+        time_tracking = _time_tracking_flight.run(_build_sample_time_tracking, timeout=SAMPLE_DATA_TIMEOUT)
+    return time_tracking.copy()
+
+# Columns whose values the local intent parser recognises in queries
+INTENT_ENTITY_COLUMNS = ["Work_Location", "Department", "Band", "Supervisory_Organization_Siglum"]
+# Local parses at or above this confidence skip the Vertex round-trip
+LOCAL_INTENT_MIN_CONFIDENCE = float(os.getenv("LOCAL_INTENT_MIN_CONFIDENCE", "0.8"))
+_intent_parser = None  # (employees frame it was compiled from, IntentParser)
+
+def get_intent_parser():
+    """IntentParser compiled from the values in the current sample employees."""
+    global _intent_parser
+    if _cached_employees is None:
+        get_sample_employees()
+    employees = _cached_employees
+    compiled = _intent_parser
+    if compiled is None or compiled[0] is not employees:
+        compiled = _intent_parser = (employees, IntentParser(employees, INTENT_ENTITY_COLUMNS))
+    return compiled[1]
+
+# Vertex-parsed intents by normalised query — repeated phrasings skip the model call
+INTENT_SYNONYMS = {"versus": "vs", "v": "vs", "dept": "department", "depts": "departments",
+                   "hrs": "hours", "qtr": "quarter", "mo": "month"}
+_intent_cache = QueryCache(int(os.getenv("INTENT_CACHE_SIZE", "1024")),
+                           float(os.getenv("INTENT_CACHE_TTL_SECONDS", "3600")))
+# How each query was answered, and the Vertex time spent on those that were not
+_intent_sources = {"local": 0, "cache": 0, "vertex": 0, "fallback": 0}
+_vertex_parse_calls = 0
+_vertex_parse_seconds = 0.0
+
+PLOTLY_CONFIG = {'displayModeBar': False, 'responsive': True}
+_MISSING = object()
+
+def _common_values(dicts):
+    """The (nested) entries that have the same value in every dict."""
+    common = {}
+    for key, value in dicts[0].items():
+        values = [d.get(key, _MISSING) for d in dicts]
+        if all(isinstance(v, dict) for v in values):
+            nested = _common_values(values)
+            if nested:
+                common[key] = nested
+        elif all(v == value for v in values[1:]):
+            common[key] = value
+    return common
+
+def _without(values, shared):
+    """values minus the (nested) entries shared already holds with the same value."""
+    rest = {}
+    for key, value in values.items():
+        base = shared.get(key, _MISSING)
+        if isinstance(value, dict) and isinstance(base, dict):
+            nested = _without(value, base)
+            if nested:
+                rest[key] = nested
+        elif value != base:
+            rest[key] = value
+    return rest
+
+def _merged(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merged(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def pack_figures(figure_specs: list) -> dict:
+    """
+    Compact JSON for the figures generate_dashboard_html() collected: one
+    Plotly.js template holding plotly's default theme plus every layout
+    value the figures share (the create_figure_layout() styling), then per
+    figure only its traces and the layout values of its own.
+    """
+    if not figure_specs:
+        return {"template": None, "figures": [], "config": PLOTLY_CONFIG}
+    specs = [json.loads(spec["figure"].to_json()) for spec in figure_specs]
+    base = specs[0]["layout"].pop("template", {})
+    for spec in specs[1:]:
+        spec["layout"].pop("template", None)
+    shared = _common_values([spec["layout"] for spec in specs])
+    return {
+        "template": {**base, "layout": _merged(base.get("layout", {}), shared)},
+        "figures": [
+            {"div_id": fs["div_id"], "data": spec["data"], "layout": _without(spec["layout"], shared)}
+            for fs, spec in zip(figure_specs, specs)
+        ],
+        "config": PLOTLY_CONFIG,
+    }
+
+# Rendered dashboards — repeated queries skip filtering and Plotly entirely
+_dashboard_cache = QueryCache(int(os.getenv("DASHBOARD_CACHE_SIZE", "256")),
+                              float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "3600")))
+
+def render_dashboard(parsed_query: dict, figure_format: str = "html") -> dict:
+    """
+    The dashboard over the filtered sample data: {"html"} with the charts
+    embedded, or for figure_format "json" the page skeleton plus
+    pack_figures() output. Cached by everything the output depends on:
+    format, dashboard type, time period, filters, focus (the title), the
+    sample data version, and the current month ("this quarter" / "this
+    month" are relative to today).
+    """
+    if _cached_employees is None or _cached_time_tracking is None:
+        get_sample_time_tracking()
+    key = json.dumps([
+        figure_format, _sample_data_version, datetime.now().strftime("%Y-%m"),
+        parsed_query.get("dashboard_type", "general"), parsed_query.get("time_period"),
+        parsed_query.get("filters") or {}, parsed_query.get("focus", "Dashboard"),
+    ], sort_keys=True, default=str)
+    rendered = _dashboard_cache.get(key)
+    if rendered is None:
+        data = filter_data(parsed_query, get_sample_employees(), get_sample_time_tracking())
+        if figure_format == "json":
+            figure_specs = []
+            html = generate_dashboard_html(parsed_query, data, figure_specs)
+            rendered = {"html": html, **pack_figures(figure_specs)}
+        else:
+            rendered = {"html": generate_dashboard_html(parsed_query, data)}
+        _dashboard_cache.put(key, rendered)
+    return rendered
 
 # ============================================================================
 # MINIMAL LANDING PAGE - Claude/OpenAI Style
@@ -225,7 +404,7 @@ async def home():
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Dashboard AI Agent</title>
-        <script src="https://cdn.plot.ly/plotly-2.27.0.min.js" charset="utf-8"></script>
+        <script src="https://cdn.plot.ly/plotly-2.35.2.min.js" charset="utf-8"></script>
         <style>
             * { margin: 0; padding: 0; box-sizing: border-box; }
             
@@ -685,7 +864,7 @@ async def home():
                     const response = await fetch('/generate-dashboard', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ query: query })
+                        body: JSON.stringify({ query: query, format: 'json' })
                     });
                     
                     const data = await response.json();
@@ -699,6 +878,11 @@ async def home():
                     } else {
                         dashboardContainer.innerHTML = data.html;
                         
+                        // Charts arrive as JSON: shared styling in one template, traces per figure
+                        (data.figures || []).forEach(fig => {
+                            window.Plotly.newPlot(fig.div_id, fig.data, { ...fig.layout, template: data.template }, data.config);
+                        });
+                        
                         // Force Plotly to resize after rendering
                         setTimeout(() => {
                             const plots = document.querySelectorAll('.js-plotly-plot');
@@ -730,26 +914,29 @@ async def home():
 
 @app.post("/generate-dashboard")
 async def generate_dashboard(request: Request):
-    """Generate professional dashboard with high-quality visualizations"""
+    """
+    Generate professional dashboard with high-quality visualizations.
+    Body: {"query", "format"}. format "html" (default) embeds each chart as
+    Plotly HTML; "json" returns the page with empty chart divs plus
+    {"template", "figures", "config"} for Plotly.newPlot on the client.
+    """
     try:
         body = await request.json()
         user_query = body.get("query", "")
+        figure_format = "json" if body.get("format") == "json" else "html"
         
         parsed_query = await parse_query_with_ai(user_query)
         
-        employees_df = get_sample_employees()
-        time_df = get_sample_time_tracking()
-        
-        filtered_data = filter_data(parsed_query, employees_df, time_df)
-        
-        dashboard_html = generate_dashboard_html(parsed_query, filtered_data)
+        rendered = render_dashboard(parsed_query, figure_format)
         
         return JSONResponse(content={
             "success": True,
-            "html": dashboard_html,
+            **rendered,
             "query_interpretation": parsed_query
         })
         
+    except LoadTimeout as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503, headers={"Retry-After": "5"})
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
@@ -760,12 +947,24 @@ async def generate_dashboard(request: Request):
 
 
 async def parse_query_with_ai(user_query: str) -> dict:
-    """Parse query with AI or fallback"""
+    """Parse query locally when that is unambiguous, otherwise with AI or fallback"""
     
-    if VERTEX_AI_ENABLED:
+    global _vertex_parse_calls, _vertex_parse_seconds
+    local = get_intent_parser().parse(user_query)
+    if local["confidence"] >= LOCAL_INTENT_MIN_CONFIDENCE:
+        _intent_sources["local"] += 1
+        return local
+
+    cache_key = normalize_query(user_query, INTENT_SYNONYMS)
+    cached = _intent_cache.get(cache_key)
+    if cached is not None:
+        _intent_sources["cache"] += 1
+        return dict(cached)
+
+    # The first call may still be importing the SDK — do that off the event loop
+    model = _query_model or await run_in_threadpool(get_query_model)
+    if model is not None:
         try:
-            model = GenerativeModel("gemini-1.5-pro-001")
-            
             prompt = f"""Parse this employee data query into JSON format.
 
 Query: "{user_query}"
@@ -782,7 +981,14 @@ Return ONLY JSON (no markdown):
     "time_period": "this quarter" | "this month" | "last 90 days" | null
 }}"""
             
-            response = model.generate_content(prompt)
+            # Async API: a slow Vertex call must not stall other requests on this worker.
+            # wait_for cancels the call when it runs past the timeout.
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(model.generate_content_async(prompt), QUERY_PARSE_TIMEOUT)
+            finally:
+                _vertex_parse_calls += 1
+                _vertex_parse_seconds += time.perf_counter() - started
             result_text = response.text.strip()
             
             if result_text.startswith("```"):
@@ -790,40 +996,23 @@ Return ONLY JSON (no markdown):
                 if result_text.startswith("json"):
                     result_text = result_text[4:]
             
-            return json.loads(result_text.strip())
+            parsed = json.loads(result_text.strip())
+            # Only successful model parses are cached — a timeout or error should be retried
+            _intent_cache.put(cache_key, parsed)
+            _intent_sources["vertex"] += 1
+            return dict(parsed)
+        except asyncio.TimeoutError:
+            print(f"Vertex AI timed out after {QUERY_PARSE_TIMEOUT}s - using fallback query parsing")
         except Exception as e:
             print(f"Vertex AI error: {e}")
     
+    _intent_sources["fallback"] += 1
     return fallback_query_parser(user_query)
 
 
 def fallback_query_parser(user_query: str) -> dict:
-    """Enhanced fallback parser"""
-    
-    query_lower = user_query.lower()
-    
-    # Time period detection
-    time_period = None
-    if "quarter" in query_lower:
-        time_period = "this quarter"
-    elif "month" in query_lower:
-        time_period = "this month"
-    
-    # Dashboard type detection
-    if any(word in query_lower for word in ["attrition", "turnover", "retention", "tenure"]):
-        return {"dashboard_type": "attrition", "filters": {}, "focus": "employee attrition analysis", "time_period": time_period}
-    elif any(word in query_lower for word in ["hours", "time", "tracking"]):
-        return {"dashboard_type": "hours", "filters": {}, "focus": "time tracking analysis", "time_period": time_period}
-    elif any(word in query_lower for word in ["band", "level"]):
-        return {"dashboard_type": "band_analysis", "filters": {}, "focus": "band distribution", "time_period": time_period}
-    elif any(word in query_lower for word in ["demographic", "age"]):
-        return {"dashboard_type": "demographics", "filters": {}, "focus": "employee demographics", "time_period": time_period}
-    elif any(word in query_lower for word in ["compare", "vs", "versus"]):
-        return {"dashboard_type": "location_compare", "filters": {}, "focus": "location comparison", "time_period": time_period}
-    elif any(word in query_lower for word in ["project", "allocation"]):
-        return {"dashboard_type": "project", "filters": {}, "focus": "project allocation", "time_period": time_period}
-    else:
-        return {"dashboard_type": "general", "filters": {}, "focus": "general overview", "time_period": time_period}
+    """Best local parse, whatever its confidence — used when Vertex is unavailable or fails"""
+    return get_intent_parser().parse(user_query)
 
 
 def filter_data(parsed_query: dict, employees_df: pd.DataFrame, time_df: pd.DataFrame) -> dict:
@@ -836,7 +1025,10 @@ def filter_data(parsed_query: dict, employees_df: pd.DataFrame, time_df: pd.Data
     
     for key, value in filters.items():
         if key in filtered_employees.columns:
-            filtered_employees = filtered_employees[filtered_employees[key] == value]
+            if isinstance(value, (list, tuple, set)):
+                filtered_employees = filtered_employees[filtered_employees[key].isin(list(value))]
+            else:
+                filtered_employees = filtered_employees[filtered_employees[key] == value]
     
     corporate_ids = filtered_employees['Corporate_ID'].tolist()
     filtered_time = time_df[time_df['Corporate_ID'].isin(corporate_ids)]
@@ -860,8 +1052,14 @@ def filter_data(parsed_query: dict, employees_df: pd.DataFrame, time_df: pd.Data
     }
 
 
-def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
-    """Generate professional dashboard with high-quality visualizations"""
+def generate_dashboard_html(parsed_query: dict, data: dict, figure_specs: list = None) -> str:
+    """
+    Generate professional dashboard with high-quality visualizations.
+    With figure_specs (a list), charts are left as empty divs and their
+    figures appended to figure_specs for the client to plot, instead of
+    being embedded as Plotly HTML.
+    """
+    go = load_plotly()
     
     dashboard_type = parsed_query.get("dashboard_type", "general")
     employees_df = data["employees"]
@@ -1006,7 +1204,18 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
     kpi_html = generate_smart_kpis()
     
     # Build visualizations based on dashboard type
-    plotly_config = {'displayModeBar': False, 'responsive': True}
+    plotly_config = PLOTLY_CONFIG
+    
+    def add_figure(fig, div_id=None, container=True):
+        if figure_specs is not None:
+            div_id = div_id or f"chart{len(figures) + 1}"
+            figure_specs.append({"div_id": div_id, "figure": fig})
+            chart = f'<div id="{div_id}"></div>'
+        else:
+            # The first chart also pulls in plotly.js from the CDN
+            chart = fig.to_html(full_html=False, include_plotlyjs=False if figures else "cdn",
+                                config=plotly_config, div_id=div_id)
+        figures.append(f'<div class="chart-container">{chart}</div>' if container else chart)
     
     def create_figure_layout(title):
         return dict(
@@ -1051,7 +1260,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             barmode='stack',
             legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1, font=dict(color=TEXT_COLOR))
         )
-        figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+        add_figure(fig1, "chart1")
         
         # Chart 2: Tenure Distribution
         fig2 = go.Figure()
@@ -1070,7 +1279,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             xaxis_title='Years of Service',
             yaxis_title='Number of Employees'
         )
-        figures.append(fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config))
+        add_figure(fig2, container=False)
         
         # Chart 3: Location-wise Retention
         location_counts = active_employees['Work_Location'].value_counts().head(8).sort_values()
@@ -1094,7 +1303,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout3['xaxis_title'] = 'Number of Employees'
         layout3['yaxis'] = dict(color=TEXT_COLOR, showgrid=False)
         fig3.update_layout(**layout3)
-        figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+        add_figure(fig3, "chart3")
         
     elif dashboard_type == "hours":
         if not time_df.empty:
@@ -1121,7 +1330,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             
             period_text = f" ({time_period.title()})" if time_period else " (Last 90 Days)"
             fig1.update_layout(**create_figure_layout(f'Total Hours by Department{period_text}'))
-            figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+            add_figure(fig1, "chart1")
             
             # Chart 2: Work Type Breakdown
             hours_by_type = time_df.groupby('Work_Type')['Hours'].sum().sort_values(ascending=False)
@@ -1140,7 +1349,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             layout2['showlegend'] = True
             layout2['legend'] = dict(orientation='v', yanchor='middle', y=0.5, xanchor='left', x=1.05, font=dict(color=TEXT_COLOR))
             fig2.update_layout(**layout2)
-            figures.append(f'<div class="chart-container">{fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart2")}</div>')
+            add_figure(fig2, "chart2")
             
             # Chart 3: Daily Trend
             time_df['Entry_Date'] = pd.to_datetime(time_df['Entry_Date'])
@@ -1175,7 +1384,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             layout3['xaxis_title'] = 'Date'
             layout3['yaxis_title'] = 'Hours'
             fig3.update_layout(**layout3)
-            figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+            add_figure(fig3, "chart3")
             
             # Chart 4: Top Projects
             project_hours = time_df.groupby('Project_Code')['Hours'].sum().sort_values(ascending=True).tail(10)
@@ -1199,7 +1408,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             layout4['yaxis'] = dict(color=TEXT_COLOR, showgrid=False)
             layout4['xaxis_title'] = 'Total Hours'
             fig4.update_layout(**layout4)
-            figures.append(f'<div class="chart-container">{fig4.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart4")}</div>')
+            add_figure(fig4, "chart4")
     
     elif dashboard_type == "band_analysis":
         # Chart 1: Band Distribution
@@ -1225,7 +1434,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
             xaxis_title='Band Level',
             yaxis_title='Number of Employees'
         )
-        figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+        add_figure(fig1, "chart1")
         
         # Chart 2: Band by Department (Stacked)
         band_dept = active_employees.groupby(['Department', 'Band']).size().unstack(fill_value=0)
@@ -1250,7 +1459,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout2['legend'] = dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1, font=dict(color=TEXT_COLOR))
         layout2['yaxis_title'] = 'Number of Employees'
         fig2.update_layout(**layout2)
-        figures.append(f'<div class="chart-container">{fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart2")}</div>')
+        add_figure(fig2, "chart2")
         
         # Chart 3: Average Tenure by Band
         tenure_by_band = active_employees.groupby('Band')['Tenure_Years'].mean().reindex(band_order)
@@ -1273,7 +1482,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout3['xaxis_title'] = 'Band'
         layout3['yaxis_title'] = 'Average Tenure (Years)'
         fig3.update_layout(**layout3)
-        figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+        add_figure(fig3, "chart3")
     
     elif dashboard_type == "demographics":
         # Chart 1: Age Distribution
@@ -1292,7 +1501,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout1['xaxis_title'] = 'Age'
         layout1['yaxis_title'] = 'Number of Employees'
         fig1.update_layout(**layout1)
-        figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+        add_figure(fig1, "chart1")
         
         # Chart 2: Department Distribution
         dept_counts = active_employees['Department'].value_counts()
@@ -1311,7 +1520,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout2['showlegend'] = True
         layout2['legend'] = dict(orientation='v', yanchor='middle', y=0.5, xanchor='left', x=1.05, font=dict(color=TEXT_COLOR))
         fig2.update_layout(**layout2)
-        figures.append(f'<div class="chart-container">{fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart2")}</div>')
+        add_figure(fig2, "chart2")
         
         # Chart 3: Top Locations
         location_counts = active_employees['Work_Location'].value_counts().head(8).sort_values()
@@ -1335,7 +1544,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout3['yaxis'] = dict(color=TEXT_COLOR, showgrid=False)
         layout3['xaxis_title'] = 'Number of Employees'
         fig3.update_layout(**layout3)
-        figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+        add_figure(fig3, "chart3")
     
     elif dashboard_type == "location_compare":
         # Chart 1: Employees by Location
@@ -1359,7 +1568,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout1['xaxis'] = dict(color=TEXT_COLOR, showgrid=False, tickangle=-45)
         layout1['yaxis_title'] = 'Number of Employees'
         fig1.update_layout(**layout1)
-        figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+        add_figure(fig1, "chart1")
         
         # Chart 2: Department Mix by Top Locations
         top_locations = location_counts.head(5).index
@@ -1383,7 +1592,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout2['xaxis'] = dict(color=TEXT_COLOR, showgrid=False, tickangle=-45)
         layout2['yaxis_title'] = 'Number of Employees'
         fig2.update_layout(**layout2)
-        figures.append(f'<div class="chart-container">{fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart2")}</div>')
+        add_figure(fig2, "chart2")
         
         # Chart 3: Average Tenure by Location
         tenure_by_loc = active_employees.groupby('Work_Location')['Tenure_Years'].mean().sort_values(ascending=False).head(8)
@@ -1406,7 +1615,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout3['xaxis'] = dict(color=TEXT_COLOR, showgrid=False, tickangle=-45)
         layout3['yaxis_title'] = 'Average Tenure (Years)'
         fig3.update_layout(**layout3)
-        figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+        add_figure(fig3, "chart3")
     
     else:  # general
         # Chart 1: Department Overview
@@ -1430,7 +1639,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout1['xaxis'] = dict(color=TEXT_COLOR, showgrid=False)
         layout1['yaxis_title'] = 'Number of Employees'
         fig1.update_layout(**layout1)
-        figures.append(f'<div class="chart-container">{fig1.to_html(full_html=False, include_plotlyjs="cdn", config=plotly_config, div_id="chart1")}</div>')
+        add_figure(fig1, "chart1")
         
         # Chart 2: Supervisory Organization Distribution
         siglum_counts = active_employees['Supervisory_Organization_Siglum'].value_counts()
@@ -1449,7 +1658,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout2['showlegend'] = True
         layout2['legend'] = dict(orientation='v', yanchor='middle', y=0.5, xanchor='left', x=1.05, font=dict(color=TEXT_COLOR))
         fig2.update_layout(**layout2)
-        figures.append(f'<div class="chart-container">{fig2.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart2")}</div>')
+        add_figure(fig2, "chart2")
         
         # Chart 3: Top Locations
         location_counts = active_employees['Work_Location'].value_counts().head(8).sort_values()
@@ -1473,7 +1682,7 @@ def generate_dashboard_html(parsed_query: dict, data: dict) -> str:
         layout3['yaxis'] = dict(color=TEXT_COLOR, showgrid=False)
         layout3['xaxis_title'] = 'Number of Employees'
         fig3.update_layout(**layout3)
-        figures.append(f'<div class="chart-container">{fig3.to_html(full_html=False, include_plotlyjs=False, config=plotly_config, div_id="chart3")}</div>')
+        add_figure(fig3, "chart3")
         
     # Combine all charts - they're already wrapped in divs with chart-grid class applied
     if figures:
@@ -1501,5 +1710,33 @@ async def health():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "vertex_ai_enabled": VERTEX_AI_ENABLED
+        "vertex_ai_enabled": VERTEX_AI_ENABLED,
+        "startup": _startup.as_dict()
     }
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """How queries were parsed, the Vertex calls and time the intent cache saved, and rendered-dashboard reuse."""
+    avg_vertex = _vertex_parse_seconds / _vertex_parse_calls if _vertex_parse_calls else 0.0
+    return {
+        "intent_sources": dict(_intent_sources),
+        "intent_cache": _intent_cache.stats(),
+        "dashboard_cache": {**_dashboard_cache.stats(), "sample_data_version": _sample_data_version},
+        "vertex_parse_calls": _vertex_parse_calls,
+        "vertex_parse_seconds": round(_vertex_parse_seconds, 3),
+        "vertex_calls_saved": _intent_cache.hits,
+        "vertex_seconds_saved_estimate": round(_intent_cache.hits * avg_vertex, 3),
+    }
+
+
+def _warm_up():
+    """Pay for the slow imports and the sample data off the request path."""
+    get_query_model()
+    load_plotly()
+    get_sample_employees()
+    get_sample_time_tracking()
+
+threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+_startup.module_loaded()
+
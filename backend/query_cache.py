@@ -0,0 +1,74 @@
+"""
+query_cache.py
+Caching of work derived from natural-language queries. Phrasings that only
+differ in case, spacing, punctuation or (optionally) synonyms normalise to
+the same key, so repeated questions skip the model call or planner.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[\W_]+")  # any run that is not a letter or digit, in any script
+
+
+def normalize_query(text, synonyms=None):
+    """Lowercase, fold punctuation and whitespace to single spaces, map words through synonyms."""
+    words = _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text or "").lower()).split()
+    if synonyms:
+        words = [synonyms.get(w, w) for w in words]
+    return " ".join(words)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU mapping whose entries also expire ttl_seconds after
+    they were stored. Counts hits, misses and expirations for stats().
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._data = OrderedDict()   # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._data[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
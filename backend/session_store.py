@@ -0,0 +1,142 @@
+"""
+session_store.py
+Server-side dashboard sessions, so chat turns send a dashboard id instead of
+re-uploading the whole dashboard and conversation on every request.
+
+Two interchangeable backends with the same get/put/delete interface:
+  MemorySessionStore — a dict in this process (single-process servers)
+  DiskSessionStore   — one JSON file per session, shared by every worker
+                       process on the host
+Entries expire SESSION_TTL seconds after they were last written or read.
+"""
+import copy
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def is_session_id(value):
+    return isinstance(value, str) and bool(_ID_PATTERN.match(value))
+
+
+class MemorySessionStore:
+    def __init__(self, ttl, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}  # id -> (last_used, entry)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            item = self._data.get(session_id)
+            if item is None:
+                return None
+            if time.time() - item[0] > self.ttl:
+                del self._data[session_id]
+                return None
+            self._data[session_id] = (time.time(), item[1])
+        # Copies in and out, as the disk store's are: callers may change what
+        # they put() or got without touching the stored session
+        return copy.deepcopy(item[1])
+
+    def put(self, session_id, entry):
+        entry = copy.deepcopy(entry)
+        with self._lock:
+            self._data[session_id] = (time.time(), entry)
+            if len(self._data) > self.max_entries:
+                self._evict()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (used, _) in self._data.items() if now - used > self.ttl]:
+            del self._data[key]
+        # Still full: drop the least recently used
+        while len(self._data) > self.max_entries:
+            del self._data[min(self._data, key=lambda k: self._data[k][0])]
+
+    def stats(self):
+        return {"backend": "memory", "entries": len(self._data), "ttl_seconds": self.ttl}
+
+
+class DiskSessionStore:
+    """Sessions as JSON files; the file mtime is the last-used time."""
+
+    SWEEP_EVERY = 300  # seconds between sweeps of expired files
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._last_sweep = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def get(self, session_id):
+        if not is_session_id(session_id):
+            return None
+        path = self._path(session_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, session_id, entry):
+        path = self._path(session_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, path)
+        if time.time() - self._last_sweep > self.SWEEP_EVERY:
+            self._sweep()
+
+    def delete(self, session_id):
+        if is_session_id(session_id):
+            try:
+                os.remove(self._path(session_id))
+            except OSError:
+                pass
+
+    def _sweep(self):
+        self._last_sweep = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if self._last_sweep - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        try:
+            entries = sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+        except OSError:
+            entries = 0
+        return {"backend": "disk", "entries": entries, "ttl_seconds": self.ttl}
+
+
+def create_session_store(backend, ttl, directory):
+    if backend == "memory":
+        return MemorySessionStore(ttl)
+    if backend == "disk":
+        return DiskSessionStore(directory, ttl)
+    raise ValueError(f"Unknown SESSION_STORE {backend!r} (expected 'memory' or 'disk')")
@@ -0,0 +1,56 @@
+"""
+singleflight.py
+Single-flight loading for lazily built, process-wide caches: concurrent
+callers share one in-progress load instead of each starting their own.
+"""
+import threading
+
+
+class LoadTimeout(TimeoutError):
+    """A caller stopped waiting for a load that is still in progress."""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call of a loader at a time. Concurrent callers wait on
+    the call in progress and share its result (or its exception).
+
+    The call runs on its own thread, so every caller — including the one
+    that started it — can give up after `timeout` seconds with LoadTimeout
+    while the load carries on and serves whoever asks next.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flight = None
+
+    def run(self, fn, timeout=None):
+        with self._lock:
+            flight = self._flight
+            if flight is None:
+                flight = self._flight = _Flight()
+                threading.Thread(target=self._execute, args=(flight, fn),
+                                 name=f"{self.name}-load", daemon=True).start()
+        if not flight.done.wait(timeout):
+            raise LoadTimeout(f"{self.name} is still loading after {timeout}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _execute(self, flight, fn):
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
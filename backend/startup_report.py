@@ -0,0 +1,61 @@
+"""
+startup_report.py
+Where process start-up time goes — a summarised `python -X importtime`.
+Eager imports are timed as steps at module level; SDKs imported lazily
+through import_module() record their import when first used, together
+with the thread that paid for it (the warm-up thread or a request).
+"""
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    def __init__(self, name):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self.module_seconds = None
+        self.steps = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, time.perf_counter() - started)
+
+    def record(self, label, seconds):
+        with self._lock:
+            self.steps.append({
+                "step": label,
+                "seconds": round(seconds, 3),
+                "thread": threading.current_thread().name,
+                "at": round(time.perf_counter() - self.t0, 3),
+            })
+
+    def import_module(self, name):
+        """importlib.import_module(), timed as a step the first time the process imports name."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        with self.step(f"import {name}"):
+            return importlib.import_module(name)
+
+    def module_loaded(self):
+        """Call at the end of the app module: prints the eager part of the report."""
+        self.module_seconds = round(time.perf_counter() - self.t0, 3)
+        print(self.summary())
+
+    def summary(self):
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s["seconds"], reverse=True)
+        parts = ", ".join(f"{s['step']} {s['seconds']:.2f}s" for s in steps[:8])
+        return f"Startup ({self.name}): module ready in {self.module_seconds}s — {parts}"
+
+    def as_dict(self):
+        with self._lock:
+            return {"module_seconds": self.module_seconds, "steps": list(self.steps)}
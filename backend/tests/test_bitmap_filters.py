@@ -0,0 +1,123 @@
+"""
+apply_filters() through the bitmap index must select exactly the rows the
+plain _filter_mask() path does, on the loaded dataset and on row subsets of
+it, which the index addresses by their RangeIndex labels.
+"""
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FILTERS = [
+    {"Department": ["Engineering"]},
+    {"Department": ["Engineering", "Design"]},
+    {"Department": ["Engineering"], "Band": ["BII", "BIII"]},
+    {"Work_Location": ["nan"]},                                  # missing values
+    {"Work_Location": ["Herndon, VA", "None"], "Band": ["BI"]},
+    {"Band": ["BIX"]},                                           # no such value
+    {"Department": ["Design"], "Employee_ID": ["E0003", "E0010", "E0042"]},  # not indexed
+    {"Age": [30, 31, 32, 33], "Band": ["BIV"]},                  # numeric, not indexed
+    {"Department": ["Design"], "Unknown": ["x"], "Band": []},    # ignored fields
+]
+
+
+def _employees(n_rows=400, seed=7):
+    rng = np.random.default_rng(seed)
+    locations = np.array(["Herndon, VA", "Seattle, WA", "New York, NY", "Remote - US", ""], dtype=object)
+    return pd.DataFrame({
+        "Employee_ID": [f"E{i % 150:04d}" for i in range(n_rows)],
+        "Snapshot_Month_Series": np.where(np.arange(n_rows) < n_rows // 2, "2024-05-01", "2024-06-01"),
+        "Department": rng.choice(["Engineering", "Data & Analytics", "Design", "Operations"], n_rows),
+        "Work_Location": rng.choice(locations, n_rows),
+        "Band": rng.choice(["BI", "BII", "BIII", "BIV", "BV"], n_rows),
+        "Age": rng.integers(22, 65, n_rows),
+    })
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    """'main (3).py' loaded from a local CSV, with no columnar cache, warm-up or GCS."""
+    tmp = tmp_path_factory.mktemp("dataset")
+    csv = tmp / "employees.csv"
+    _employees().to_csv(csv, index=False)
+    saved = dict(os.environ)
+    os.environ.update({
+        "LOCAL_DATA_FILE": str(csv),
+        "DATA_CACHE_DIR": str(tmp / "cache"),
+        "WARMUP_ENABLED": "0",
+        "SESSION_STORE": "memory",
+        "CATEGORICAL_MAX_UNIQUE": "100",
+    })
+    try:
+        spec = importlib.util.spec_from_file_location("dashboard_app", os.path.join(BACKEND, "main (3).py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    module.ARROW_CACHE_ENABLED = False
+    module.load_dataset()
+    return module
+
+
+def _masked(app, df, active_filters, monkeypatch):
+    """apply_filters() with the bitmap index switched off — every field through _filter_mask()."""
+    with monkeypatch.context() as m:
+        m.setattr(app, "get_bitmap_index", lambda: None)
+        return app.apply_filters(df, active_filters)
+
+
+def _assert_same_rows(indexed, masked):
+    assert indexed.index.tolist() == masked.index.tolist()
+    pd.testing.assert_frame_equal(indexed, masked)
+
+
+def test_dataset_is_indexed(app):
+    df = app.load_dataset()
+    index = app.get_bitmap_index()
+    assert index.df is df and index.covers(df)
+    assert isinstance(df.index, pd.RangeIndex)
+    assert index.indexes("Department") and index.indexes("Work_Location")
+    assert not index.indexes("Employee_ID") and not index.indexes("Age")
+
+
+@pytest.mark.parametrize("active_filters", FILTERS)
+def test_filters_on_the_dataset(app, monkeypatch, active_filters):
+    df = app.load_dataset()
+    _assert_same_rows(app.apply_filters(df, active_filters), _masked(app, df, active_filters, monkeypatch))
+
+
+@pytest.mark.parametrize("active_filters", FILTERS)
+def test_filters_on_the_latest_snapshot(app, monkeypatch, active_filters):
+    latest, _ = app.get_latest_snapshot(app.load_dataset())
+    assert latest.index[0] > 0 and app.get_bitmap_index().covers(latest)
+    _assert_same_rows(app.apply_filters(latest, active_filters),
+                      _masked(app, latest, active_filters, monkeypatch))
+
+
+@pytest.mark.parametrize("first", FILTERS[:3])
+@pytest.mark.parametrize("second", FILTERS)
+def test_filters_on_a_filtered_frame(app, monkeypatch, first, second):
+    latest, _ = app.get_latest_snapshot(app.load_dataset())
+    subset = app.apply_filters(latest, first)
+    assert app.get_bitmap_index().covers(subset)
+    _assert_same_rows(app.apply_filters(subset, second), _masked(app, subset, second, monkeypatch))
+
+
+def test_filters_on_a_reindexed_frame(app, monkeypatch):
+    """Labels that are no longer dataset positions must not be resolved through the index."""
+    latest, _ = app.get_latest_snapshot(app.load_dataset())
+    reindexed = app.apply_filters(latest, {"Department": ["Engineering"]}).reset_index(drop=True)
+    active_filters = {"Band": ["BII"]}
+    _assert_same_rows(app.apply_filters(reindexed, active_filters),
+                      _masked(app, reindexed, active_filters, monkeypatch))
+
+
+def test_frames_of_another_version_are_not_indexed(app):
+    other = app.load_dataset().copy()
+    other.attrs["dataset_version"] = app.get_bitmap_index().version + 1
+    assert not app.get_bitmap_index().covers(other)
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from json_stream import JSONStream, repair_json
+
+DOCUMENT = {
+    "message": "Here is the update",
+    "dashboard": {
+        "title": "Headcount",
+        "visualizations": [
+            {"id": "viz-1", "type": "bar", "fields": ["Band"], "stacked": False},
+            {"id": "viz-2", "type": "table", "fields": ["Band", "Gender"], "rows": [[1, 2], [3, 4]]},
+        ],
+        "total": 1250,
+        "ratio": 0.75,
+        "archived": True,
+        "owner": None,
+    },
+    "suggestions": ["By location", "By band"],
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Inside a string: the partial string and its key are dropped
+    ('{"message": "Here is the upd', {}),
+    ('{"a": 1, "b": "hel', {"a": 1}),
+    ('{"a": 1, "b": "say \\"hi', {"a": 1}),
+    # Inside a key, or before its value
+    ('{"a": 1, "bb', {"a": 1}),
+    ('{"a": 1, "b"', {"a": 1}),
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "b": ', {"a": 1}),
+    # Inside a number: it may be missing digits, so it is dropped
+    ('{"a": 1, "b": 12', {"a": 1}),
+    ('{"a": 1, "b": -1.5e', {"a": 1}),
+    ('{"a": 1, "b": 0.', {"a": 1}),
+    ('[1, 2', [1]),
+    # Inside true / false / null, and just after a complete one
+    ('{"a": 1, "b": tr', {"a": 1}),
+    ('{"a": 1, "b": fals', {"a": 1}),
+    ('{"a": 1, "b": nul', {"a": 1}),
+    ('{"a": 1, "b": true', {"a": 1, "b": True}),
+    ('{"a": 1, "b": null', {"a": 1, "b": None}),
+    # Nested arrays
+    ('{"a": [[1, 2], [3', {"a": [[1, 2], []]}),
+    ('{"a": [[1, 2], [3, 4]', {"a": [[1, 2], [3, 4]]}),
+    ('{"a": [[1, 2], [3, 4]], "b": [["x", "y', {"a": [[1, 2], [3, 4]], "b": [["x"]]}),
+    ('[[[', [[[]]]),
+    # Only the opening bracket, or no JSON at all
+    ('{', {}),
+    ('not json', None),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_repair_json_leaves_complete_documents_alone():
+    text = json.dumps(DOCUMENT)
+    assert repair_json(text) == DOCUMENT
+
+
+def test_every_cut_repairs_to_a_prefix_of_the_document():
+    text = json.dumps(DOCUMENT)
+    for end in range(1, len(text)):
+        repaired = repair_json(text[:end])
+        assert repaired is not None, text[:end]
+        _assert_prefix(repaired, DOCUMENT)
+
+
+def _assert_prefix(partial, full):
+    """partial holds nothing full does not, and every scalar in it is whole."""
+    if isinstance(partial, dict):
+        assert isinstance(full, dict)
+        for key, value in partial.items():
+            assert key in full
+            _assert_prefix(value, full[key])
+    elif isinstance(partial, list):
+        assert isinstance(full, list) and len(partial) <= len(full)
+        for value, whole in zip(partial, full):
+            _assert_prefix(value, whole)
+    else:
+        assert partial == full
+
+
+def test_reply_cut_inside_the_dashboard_key_has_no_dashboard():
+    stream = JSONStream()
+    stream.feed('{"message": "Here is the update", "dashb')
+    assert not stream.complete
+    assert stream.value() == {"message": "Here is the update"}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10_000])
+def test_stream_hands_out_array_items_as_they_close(chunk_size):
+    text = "```json\n" + json.dumps(DOCUMENT) + "\n```"
+    stream = JSONStream(array_key="visualizations")
+    seen = []
+    for i in range(0, len(text), chunk_size):
+        seen.extend(stream.feed(text[i:i + chunk_size]))
+    assert seen == DOCUMENT["dashboard"]["visualizations"]
+    assert stream.items == seen
+    assert stream.complete
+    assert stream.value() == DOCUMENT
+
+
+def test_stream_item_is_handed_out_once_it_closes():
+    stream = JSONStream(array_key="visualizations")
+    assert stream.feed('{"visualizations": [{"id": "viz-1", "fields": ["Band"]') == []
+    assert stream.feed('}, {"id": "viz-2"') == [{"id": "viz-1", "fields": ["Band"]}]
+    # value() also keeps the complete members of the item still open
+    assert stream.value() == {"visualizations": [{"id": "viz-1", "fields": ["Band"]}, {"id": "viz-2"}]}
+
+
+def test_stream_ignores_text_around_the_document():
+    stream = JSONStream()
+    stream.feed('Sure! ```json\n{"a": [1, {"b": "}"}]}')
+    stream.feed('\n``` anything {after}')
+    assert stream.complete
+    assert stream.value() == {"a": [1, {"b": "}"}]}
+
+
+def test_stream_without_json_has_no_value():
+    stream = JSONStream()
+    stream.feed("The model declined to answer.")
+    assert stream.value() is None
@@ -0,0 +1,49 @@
+import pytest
+
+from session_store import create_session_store, is_session_id, new_session_id
+
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path):
+    return create_session_store(request.param, ttl=60, directory=str(tmp_path))
+
+
+def _entry():
+    return {
+        "dashboard": {"title": "Headcount", "visualizations": [{"id": "viz-1", "computed_data": [{"n": 1}]}]},
+        "history": [{"role": "user", "content": "headcount by band"}],
+    }
+
+
+def test_round_trip(store):
+    session_id = new_session_id()
+    assert is_session_id(session_id)
+    store.put(session_id, _entry())
+    assert store.get(session_id) == _entry()
+
+
+def test_changes_after_put_do_not_reach_the_store(store):
+    session_id = new_session_id()
+    entry = _entry()
+    store.put(session_id, entry)
+    entry["dashboard"]["title"] = "Changed"
+    entry["dashboard"]["visualizations"][0]["computed_data"].append({"n": 2})
+    entry["history"].append({"role": "assistant", "content": "done"})
+    assert store.get(session_id) == _entry()
+
+
+def test_changes_to_a_get_do_not_reach_the_store(store):
+    session_id = new_session_id()
+    store.put(session_id, _entry())
+    got = store.get(session_id)
+    got["dashboard"]["visualizations"].clear()
+    got["history"] = []
+    assert store.get(session_id) == _entry()
+
+
+def test_unknown_and_deleted_sessions(store):
+    session_id = new_session_id()
+    assert store.get(session_id) is None
+    store.put(session_id, _entry())
+    store.delete(session_id)
+    assert store.get(session_id) is None
@@ -648,33 +648,69 @@ const DashboardAgent = () => {
     return dict;
   };
 
-  // Recompute all chart data when filters change — this is what makes filters actually work
+  // Recompute all chart data when filters change — this is what makes filters actually work.
+  // One batch request per filter change: the backend filters once and computes every chart.
   const recomputeChartsWithFilters = async (newFilters, currentDashboard) => {
     if (!currentDashboard?.visualizations) return;
     const filterDict = buildFilterDict(newFilters);
-    const updated = await Promise.all(
-      currentDashboard.visualizations.map(async (viz) => {
-        try {
-          const res = await fetch(`${API_URL}/api/chart-data`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              type: viz.type,
-              fields: viz.fields || [],
-              data_hint: viz.data_hint || '',
-              active_filters: filterDict,
-            }),
-          });
-          const json = await res.json();
-          return json.data?.length > 0 ? { ...viz, computed_data: json.data } : viz;
-        } catch { return viz; }
-      })
-    );
+    const vizKey = (viz, i) => String(viz.id ?? i);
+    let results = {};
+    try {
+      const res = await fetch(`${API_URL}/api/chart-data/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          visualizations: currentDashboard.visualizations.map((viz, i) => ({
+            id: vizKey(viz, i),
+            type: viz.type,
+            fields: viz.fields || [],
+          })),
+          active_filters: filterDict,
+        }),
+      });
+      const json = await res.json();
+      results = json.data || {};
+    } catch { return; }
+    const updated = currentDashboard.visualizations.map((viz, i) => {
+      const data = results[vizKey(viz, i)];
+      return data?.length > 0 ? { ...viz, computed_data: data } : viz;
+    });
     setChats(p => p.map(c => c.id === activeChat
       ? { ...c, dashboard: { ...currentDashboard, visualizations: updated } }
       : c));
   };
 
+  // The server keeps each dashboard and its conversation under dashboardId, so
+  // requests send just the id. If the server no longer has it (expired, or another
+  // instance answered) it replies 409 and we resend the full state once.
+  const postDashboardRequest = async (url, chat, body, fullState) => {
+    const post = (payload) => fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+    });
+    if (chat?.dashboardId) {
+      const res = await post({ ...body, dashboard_id: chat.dashboardId });
+      if (res.status !== 409) return res;
+    }
+    return post({ ...body, ...fullState });
+  };
+
+  // Calls onEvent for each line of an NDJSON response body as it arrives.
+  const readEvents = async (res, onEvent) => {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = done ? '' : lines.pop();
+      lines.filter(l => l.trim()).forEach(l => onEvent(JSON.parse(l)));
+      if (done) return;
+    }
+  };
+
   // Deeper insights — calls dedicated endpoint with actual computed data
   const handleDeeperInsights = async () => {
     if (!dashboard) return;
@@ -683,15 +719,12 @@ const DashboardAgent = () => {
     setActionPanel(null);
     try {
       const filterDict = buildFilterDict(activeFilters);
-      const res = await fetch(`${API_URL}/api/deeper-insights`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ dashboard, active_filters: filterDict }),
-      });
+      const res = await postDashboardRequest(`${API_URL}/api/deeper-insights`, activeChartData,
+        { active_filters: filterDict }, { dashboard });
       const data = await res.json();
       if (data.dashboard) {
         setChats(p => p.map(c => c.id === activeChat
-          ? { ...c, dashboard: data.dashboard, messages: [...c.messages, { role: 'assistant', content: data.message || 'Insights refreshed with actual data.' }] }
+          ? { ...c, dashboard: data.dashboard, dashboardId: data.dashboard_id || c.dashboardId, messages: [...c.messages, { role: 'assistant', content: data.message || 'Insights refreshed with actual data.' }] }
           : c));
       }
     } catch (err) {
@@ -711,21 +744,41 @@ const DashboardAgent = () => {
     setActionPanel(null);
     try {
       setGenStep('Generating dashboard…');
-      const res = await fetch(`${API_URL}/api/chat`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          message,
+      const res = await postDashboardRequest(`${API_URL}/api/chat/stream`, currentChat,
+        { message, active_filters: buildFilterDict(activeFilters) },
+        {
           history: (history || currentChat?.messages || []).slice(-6),
           current_dashboard: currentChat?.dashboard || null,
-          active_filters: buildFilterDict(activeFilters),
-        }),
-      });
+        });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      setGenStep('Rendering visualizations…');
-      const data = await res.json();
+      // Charts arrive first with their real data; titles and insights fill in by id as the model writes them
+      let data = null;
+      await readEvents(res, (event) => {
+        if (event.event === 'plans') {
+          setGenStep('Writing insights…');
+          setChats(p => p.map(c => {
+            if (c.id !== cid) return c;
+            const previous = c.dashboard?.visualizations || [];
+            const visualizations = event.visualizations.map(v => ({
+              title: v.fields.join(' by '), description: '', key_insights: [],
+              ...previous.find(o => o.id === v.id), ...v,
+            }));
+            return { ...c, dashboardId: event.dashboard_id || c.dashboardId, dashboard: { title: 'Generating dashboard…', ...c.dashboard, visualizations } };
+          }));
+        } else if (event.event === 'visualization') {
+          const { event: _, id, ...narrative } = event;
+          setChats(p => p.map(c => c.id === cid && c.dashboard
+            ? { ...c, dashboard: { ...c.dashboard, visualizations: c.dashboard.visualizations.map(v => v.id === id ? { ...v, ...narrative } : v) } }
+            : c));
+        } else if (event.event === 'done') {
+          data = event;
+        } else if (event.event === 'error') {
+          throw new Error(event.error);
+        }
+      });
+      if (!data) throw new Error('Response ended early');
       setSuggestions(data.suggestions || []);
-      setChats(p => p.map(c => c.id === cid ? { ...c, messages: [...c.messages, { role: 'assistant', content: data.response || 'Dashboard generated.' }], dashboard: data.dashboard || c.dashboard, title: data.dashboard?.title || c.title } : c));
+      setChats(p => p.map(c => c.id === cid ? { ...c, messages: [...c.messages, { role: 'assistant', content: data.response || 'Dashboard generated.' }], dashboard: data.dashboard || c.dashboard, dashboardId: data.dashboard_id || c.dashboardId, title: data.dashboard?.title || c.title } : c));
     } catch (err) {
       console.error(err);
       setChats(p => p.map(c => c.id === cid ? { ...c, messages: [...c.messages, { role: 'assistant', content: 'Sorry, something went wrong. Please try again.' }] } : c));